@@ -203,7 +203,20 @@ class DecisionCoreAgent:
         market_data: Optional[Dict] = None
     ) -> VoteResult:
         """
-        执行加权投票决策
+        执行加权投票决策 (异步接口，逻辑见 make_decision_sync)
+        """
+        return self.make_decision_sync(quant_analysis, predict_result, market_data)
+
+    def make_decision_sync(
+        self, 
+        quant_analysis: Dict, 
+        predict_result: Optional[PredictResult] = None,
+        market_data: Optional[Dict] = None
+    ) -> VoteResult:
+        """
+        执行加权投票决策 (同步版本，纯CPU计算，无I/O)
+        
+        回测等高频调用方可直接调用，避免每步的协程调度开销。
         
         Args:
             quant_analysis: QuantAnalystAgent的输出
@@ -67,11 +67,11 @@ class QuantAnalystAgent:
 
     @staticmethod
     def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
-        tr1 = high - low
-        tr2 = (high - close.shift()).abs()
-        tr3 = (low - close.shift()).abs()
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        return tr.ewm(alpha=1/period, adjust=False).mean()
+        h = high.to_numpy(dtype=float)
+        l = low.to_numpy(dtype=float)
+        prev_close = close.shift().to_numpy(dtype=float)
+        tr = np.fmax(np.fmax(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+        return pd.Series(tr, index=high.index).ewm(alpha=1/period, adjust=False).mean()
         
     @staticmethod
     def calculate_bollinger_bands(series: pd.Series, window: int = 20, num_std: float = 2.0):
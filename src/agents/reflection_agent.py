@@ -158,7 +158,7 @@ class ReflectionAgentLLM:
                 # 🆕 保存反思日志
                 try:
                     from src.server.state import global_state
-                    if hasattr(global_state, 'saver'):
+                    if global_state.saver is not None:
                         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                         global_state.saver.save_reflection(
                             reflection=json.dumps(result.raw_response, ensure_ascii=False, indent=2) if result.raw_response else result.summary,
@@ -489,7 +489,7 @@ class ReflectionAgent:
 
         try:
             from src.server.state import global_state
-            if hasattr(global_state, 'saver'):
+            if global_state.saver is not None:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 global_state.saver.save_reflection(
                     reflection=json.dumps(raw_response, ensure_ascii=False, indent=2),
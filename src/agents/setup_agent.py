@@ -150,7 +150,7 @@ class SetupAgentLLM:
             # 🆕 保存日志
             try:
                 from src.server.state import global_state
-                if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+                if global_state.saver is not None:
                     global_state.saver.save_setup_analysis(
                         analysis=analysis,
                         input_data=data,
@@ -302,7 +302,7 @@ class SetupAgent:
 
         try:
             from src.server.state import global_state
-            if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+            if global_state.saver is not None:
                 global_state.saver.save_setup_analysis(
                     analysis=analysis,
                     input_data=data,
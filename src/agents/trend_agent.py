@@ -133,7 +133,7 @@ class TrendAgentLLM:
             # 🆕 保存日志
             try:
                 from src.server.state import global_state
-                if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+                if global_state.saver is not None:
                     global_state.saver.save_trend_analysis(
                         analysis=analysis,
                         input_data=data,
@@ -271,7 +271,7 @@ class TrendAgent:
 
         try:
             from src.server.state import global_state
-            if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+            if global_state.saver is not None:
                 global_state.saver.save_trend_analysis(
                     analysis=analysis,
                     input_data=data,
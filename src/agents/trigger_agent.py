@@ -118,7 +118,7 @@ class TriggerAgentLLM:
             # 🆕 保存日志
             try:
                 from src.server.state import global_state
-                if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+                if global_state.saver is not None:
                     global_state.saver.save_trigger_analysis(
                         analysis=analysis,
                         input_data=data,
@@ -241,7 +241,7 @@ class TriggerAgent:
 
         try:
             from src.server.state import global_state
-            if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+            if global_state.saver is not None:
                 global_state.saver.save_trigger_analysis(
                     analysis=analysis,
                     input_data=data,
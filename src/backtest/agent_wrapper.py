@@ -15,11 +15,13 @@ Date: 2025-12-31
 import pandas as pd
 import numpy as np
 import asyncio
+import inspect
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
 from src.agents.decision_core_agent import DecisionCoreAgent
 from src.strategy.composer import StrategyComposer # ✅ Shared Strategy Logic
+from src.utils.jit import njit
 from src.utils.logger import log
 
 @dataclass
@@ -29,6 +31,109 @@ class MockPredictResult:
     confidence: float = 0.0
 
 
+@njit(cache=True, fastmath=True)
+def _all_signals(high, low, close, ema20_span, ema60_span, rsi_p, k_n, k_m1, k_m2):
+    """
+    Fused trend + oscillator kernel: one pass over high/low/close.
+
+    Mirrors the pandas helpers of BacktestSignalCalculator (EMA adjust=False,
+    rolling-mean RSI, rolling min/max KDJ with EWM smoothing) and returns only
+    the last values: (ema20, ema60, rsi, j). Invalid outputs are NaN.
+    Flags are used instead of NaN checks because fastmath assumes no NaNs.
+    """
+    n = close.shape[0]
+    a20 = 2.0 / (ema20_span + 1.0)
+    a60 = 2.0 / (ema60_span + 1.0)
+    ak = 1.0 / k_m1
+    ad = 1.0 / k_m2
+
+    e20 = close[0]
+    e60 = close[0]
+
+    # Monotonic deques (index stacks) for KDJ rolling min(low) / max(high)
+    min_q = np.empty(n, dtype=np.int64)
+    max_q = np.empty(n, dtype=np.int64)
+    min_head = 0
+    min_tail = 0
+    max_head = 0
+    max_tail = 0
+
+    # EWM state for K and D (pandas adjust=False, ignore_na=False semantics)
+    k = 0.0
+    d = 0.0
+    k_wt = 1.0
+    d_wt = 1.0
+    k_started = False
+
+    for i in range(n):
+        c = close[i]
+        if i > 0:
+            e20 = (1.0 - a20) * e20 + a20 * c
+            e60 = (1.0 - a60) * e60 + a60 * c
+
+        while min_tail > min_head and low[min_q[min_tail - 1]] >= low[i]:
+            min_tail -= 1
+        min_q[min_tail] = i
+        min_tail += 1
+        if min_q[min_head] <= i - k_n:
+            min_head += 1
+
+        while max_tail > max_head and high[max_q[max_tail - 1]] <= high[i]:
+            max_tail -= 1
+        max_q[max_tail] = i
+        max_tail += 1
+        if max_q[max_head] <= i - k_n:
+            max_head += 1
+
+        rsv_valid = False
+        rsv = 0.0
+        if i >= k_n - 1:
+            low_min = low[min_q[min_head]]
+            span = high[max_q[max_head]] - low_min
+            if span != 0.0:
+                rsv = 100.0 * (c - low_min) / span
+                rsv_valid = True
+
+        if not k_started:
+            if rsv_valid:
+                k = rsv
+                d = rsv
+                k_started = True
+        else:
+            k_wt *= 1.0 - ak
+            if rsv_valid:
+                k = (k_wt * k + ak * rsv) / (k_wt + ak)
+                k_wt = 1.0
+            d_wt *= 1.0 - ad
+            d = (d_wt * d + ad * k) / (d_wt + ad)
+            d_wt = 1.0
+
+    # RSI: simple mean of the last rsi_p gains/losses (same as rolling().mean())
+    rsi = np.nan
+    if n >= rsi_p:
+        gain = 0.0
+        loss = 0.0
+        for i in range(n - rsi_p, n):
+            if i > 0:
+                delta = close[i] - close[i - 1]
+                if delta > 0.0:
+                    gain += delta
+                elif delta < 0.0:
+                    loss -= delta
+        gain /= rsi_p
+        loss /= rsi_p
+        if loss == 0.0:
+            loss = 1e-10
+        rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+
+    j = 3.0 * k - 2.0 * d if k_started else np.nan
+    return e20, e60, rsi, j
+
+
+def _as_f64(series) -> np.ndarray:
+    return np.ascontiguousarray(series.to_numpy(dtype=np.float64))
+
+
 class BacktestSignalCalculator:
     """
     Re-implements core signal logic for Backtesting.
@@ -74,19 +179,8 @@ class BacktestSignalCalculator:
         macd_hist = (macd_line - signal_line) * 2
         return macd_line, signal_line, macd_hist
 
-    def analyze_trend(self, df: pd.DataFrame) -> Dict:
-        """Calculate trend score (-100 to +100)"""
-        if df is None or len(df) < 60:
-            return {'score': 0, 'signal': 'neutral', 'details': {}}
-        
-        close = df['close']
-        ema20 = self.calculate_ema(close, 20)
-        ema60 = self.calculate_ema(close, 60)
-        
-        curr_close = close.iloc[-1]
-        curr_ema20 = ema20.iloc[-1]
-        curr_ema60 = ema60.iloc[-1]
-        
+    @staticmethod
+    def _score_trend(curr_close: float, curr_ema20: float, curr_ema60: float) -> Dict:
         score = 0
         details = {'ema_status': 'neutral'}
         
@@ -111,23 +205,8 @@ class BacktestSignalCalculator:
         
         return {'score': score, 'signal': 'long' if score > 0 else 'short', 'details': details}
 
-    def analyze_oscillator(self, df: pd.DataFrame) -> Dict:
-        """Calculate oscillator score (-100 to +100)"""
-        if df is None or len(df) < 30:
-            return {'score': 0, 'signal': 'neutral', 'details': {}}
-            
-        close = df['close']
-        high = df['high']
-        low = df['low']
-        
-        # RSI
-        rsi = self.calculate_rsi(close, 14)
-        curr_rsi = rsi.iloc[-1]
-        
-        # KDJ
-        k, d, j = self.calculate_kdj(high, low, close)
-        curr_j = j.iloc[-1]
-        
+    @staticmethod
+    def _score_oscillator(curr_rsi: float, curr_j: float) -> Dict:
         score = 0
         details = {'rsi_value': round(curr_rsi, 1), 'kdj_j': round(curr_j, 1)}
         
@@ -145,19 +224,65 @@ class BacktestSignalCalculator:
              
         return {'score': score, 'signal': 'long' if score > 0 else 'short', 'details': details}
 
+    def analyze_trend(self, df: pd.DataFrame) -> Dict:
+        """Calculate trend score (-100 to +100)"""
+        if df is None or len(df) < 60:
+            return {'score': 0, 'signal': 'neutral', 'details': {}}
+        
+        close = df['close']
+        ema20 = self.calculate_ema(close, 20)
+        ema60 = self.calculate_ema(close, 60)
+        
+        return self._score_trend(close.iloc[-1], ema20.iloc[-1], ema60.iloc[-1])
+
+    def analyze_oscillator(self, df: pd.DataFrame) -> Dict:
+        """Calculate oscillator score (-100 to +100)"""
+        if df is None or len(df) < 30:
+            return {'score': 0, 'signal': 'neutral', 'details': {}}
+            
+        close = df['close']
+        high = df['high']
+        low = df['low']
+        
+        # RSI
+        rsi = self.calculate_rsi(close, 14)
+        
+        # KDJ
+        k, d, j = self.calculate_kdj(high, low, close)
+        
+        return self._score_oscillator(rsi.iloc[-1], j.iloc[-1])
+
+    def _compute_tf(self, df: pd.DataFrame):
+        """
+        Trend + oscillator scores for one timeframe via the fused kernel.
+        Equivalent to (analyze_trend(df), analyze_oscillator(df)).
+        """
+        n = 0 if df is None else len(df)
+        if n < 30:
+            return (
+                {'score': 0, 'signal': 'neutral', 'details': {}},
+                {'score': 0, 'signal': 'neutral', 'details': {}},
+            )
+        
+        close = _as_f64(df['close'])
+        ema20, ema60, rsi, j = _all_signals(
+            _as_f64(df['high']), _as_f64(df['low']), close, 20, 60, 14, 9, 3, 3
+        )
+        
+        if n < 60:
+            trend = {'score': 0, 'signal': 'neutral', 'details': {}}
+        else:
+            trend = self._score_trend(close[-1], ema20, ema60)
+        return trend, self._score_oscillator(float(rsi), float(j))
+
     def compute_all_signals(self, snapshot) -> Dict:
         """
         Compute full quant analysis structure compatible with DecisionCoreAgent
         """
-        # Calculate Trend Scores
-        t_5m = self.analyze_trend(snapshot.stable_5m)
-        t_15m = self.analyze_trend(snapshot.stable_15m)
-        t_1h = self.analyze_trend(snapshot.stable_1h)
-        
-        # Calculate Oscillator Scores
-        o_5m = self.analyze_oscillator(snapshot.stable_5m)
-        o_15m = self.analyze_oscillator(snapshot.stable_15m)
-        o_1h = self.analyze_oscillator(snapshot.stable_1h)
+        # Trend + Oscillator Scores (one fused pass per timeframe)
+        t_5m, o_5m = self._compute_tf(snapshot.stable_5m)
+        t_15m, o_15m = self._compute_tf(snapshot.stable_15m)
+        t_1h, o_1h = self._compute_tf(snapshot.stable_1h)
         
         # Structure matches QuantAnalystAgent output
         return {
@@ -199,6 +324,10 @@ class BacktestAgentRunner:
         self.quant_analyst = QuantAnalystAgent() # Replaces legacy calculator
         self.strategy_composer = StrategyComposer(use_llm=self.config.get('use_llm', False)) # ✅ Shared Strategy Logic
         
+        # Bind the decision entry point once: prefer the sync path (no coroutine per bar)
+        self._decide = getattr(self.decision_core, 'make_decision_sync', None) or self.decision_core.make_decision
+        self._decide_is_async = inspect.iscoroutinefunction(self._decide)
+        
         # LLM log collection for backtest
         self.llm_logs = []  # Store LLM interaction logs
         
@@ -249,11 +378,13 @@ class BacktestAgentRunner:
                  'current_price': live_price
             }
             
-            vote_result = await self.decision_core.make_decision(
+            vote_result = self._decide(
                 quant_analysis=quant_analysis,
                 predict_result=predict_result,
                 market_data=market_data_for_critic
             )
+            if self._decide_is_async:
+                vote_result = await vote_result
             
             # 3. LLM Enhancement (if enabled)
             # OPTIMIZATION: Skip LLM during warmup (when trend scores are 0 due to insufficient data)
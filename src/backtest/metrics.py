@@ -8,13 +8,68 @@ Author: AI Trader Team
 Date: 2025-12-31
 """
 
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 from dataclasses import dataclass
+import re
 import pandas as pd
 import numpy as np
 from datetime import timedelta
 
 from src.backtest.portfolio import Trade, Side
+from src.utils.jit import njit
+
+
+@njit(cache=True, fastmath=True, error_model='numpy')
+def _risk_kernel(eq):
+    """
+    单次遍历净值计算收益率统计 (Welford 在线方差)
+    
+    Returns:
+        (std, downside_std, n, n_neg): 收益率样本标准差、负收益样本标准差及各自样本数
+        (样本数 < 2 时标准差为 0，由调用方判断)
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    n_neg = 0
+    mean_neg = 0.0
+    m2_neg = 0.0
+    for i in range(1, eq.shape[0]):
+        r = (eq[i] - eq[i - 1]) / eq[i - 1]
+        n += 1
+        delta = r - mean
+        mean += delta / n
+        m2 += delta * (r - mean)
+        if r < 0.0:
+            n_neg += 1
+            delta = r - mean_neg
+            mean_neg += delta / n_neg
+            m2_neg += delta * (r - mean_neg)
+    std = np.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+    downside_std = np.sqrt(m2_neg / (n_neg - 1)) if n_neg > 1 else 0.0
+    return std, downside_std, n, n_neg
+
+
+def _compile_to_dict(fields) -> Callable:
+    """
+    根据 (键, 格式模板) 表生成 to_dict 函数
+    
+    模板在类定义时被展开成单个 f-string 字典字面量并 exec 编译，
+    调用时无需再解析格式串或查找 vars(self)。
+    """
+    items = []
+    for key, template in fields:
+        if template is None:
+            value = f"self.{key}"
+        else:
+            value = "f" + repr(re.sub(r"\{(\w+)", r"{self.\1", template))
+        items.append(f"        {key!r}: {value},")
+    source = "def to_dict(self) -> Dict:\n    return {\n" + "\n".join(items) + "\n    }\n"
+    namespace = {"Dict": Dict}
+    exec(source, namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = "转换为字典"
+    return to_dict
 
 
 @dataclass
@@ -62,48 +117,49 @@ class MetricsResult:
     total_days: int
     trading_days: int
     
-    def to_dict(self) -> Dict:
-        """转换为字典"""
-        return {
-            # 收益指标
-            'total_return': f"{self.total_return:.2f}%",
-            # 'annualized_return': f"{self.annualized_return:.2f}%",  # Removed: misleading for short backtests
-            'final_equity': f"{self.final_equity:.2f}",
-            'profit_amount': f"{self.profit_amount:+.2f}",
-            'max_drawdown': f"${self.max_drawdown:.2f}",
-            'max_drawdown_pct': f"{self.max_drawdown_pct:.2f}%",
-            'max_drawdown_duration': f"{self.max_drawdown_duration} days",
-            
-            # 风险指标
-            'sharpe_ratio': f"{self.sharpe_ratio:.2f}",
-            'sortino_ratio': f"{self.sortino_ratio:.2f}",
-            'calmar_ratio': f"{self.calmar_ratio:.2f}",
-            'volatility': f"{self.volatility:.2f}%",
-            
-            # 交易统计
-            'total_trades': self.total_trades,
-            'win_rate': f"{self.win_rate:.1f}%",
-            'profit_factor': f"{self.profit_factor:.2f}",
-            'avg_trade_pnl': f"${self.avg_trade_pnl:.2f}",
-            'avg_win': f"${self.avg_win:.2f}",
-            'avg_loss': f"${self.avg_loss:.2f}",
-            'largest_win': f"${self.largest_win:.2f}",
-            'largest_loss': f"${self.largest_loss:.2f}",
-            'avg_holding_time': f"{self.avg_holding_time:.1f}h",
-            
-            # 多空统计
-            'long_trades': self.long_trades,
-            'short_trades': self.short_trades,
-            'long_win_rate': f"{self.long_win_rate:.1f}%",
-            'short_win_rate': f"{self.short_win_rate:.1f}%",
-            'long_pnl': f"${self.long_pnl:.2f}",
-            'short_pnl': f"${self.short_pnl:.2f}",
-            
-            # 时间统计
-            'period': f"{self.start_date} to {self.end_date}",
-            'total_days': self.total_days,
-            'trading_days': self.trading_days,
-        }
+    # to_dict 输出表: (键, 格式模板)，模板为 None 时直接输出属性原值；类定义时编译为 to_dict
+    _FIELDS = (
+        # 收益指标
+        ('total_return', '{total_return:.2f}%'),
+        # ('annualized_return', '{annualized_return:.2f}%'),  # Removed: misleading for short backtests
+        ('final_equity', '{final_equity:.2f}'),
+        ('profit_amount', '{profit_amount:+.2f}'),
+        ('max_drawdown', '${max_drawdown:.2f}'),
+        ('max_drawdown_pct', '{max_drawdown_pct:.2f}%'),
+        ('max_drawdown_duration', '{max_drawdown_duration} days'),
+        
+        # 风险指标
+        ('sharpe_ratio', '{sharpe_ratio:.2f}'),
+        ('sortino_ratio', '{sortino_ratio:.2f}'),
+        ('calmar_ratio', '{calmar_ratio:.2f}'),
+        ('volatility', '{volatility:.2f}%'),
+        
+        # 交易统计
+        ('total_trades', None),
+        ('win_rate', '{win_rate:.1f}%'),
+        ('profit_factor', '{profit_factor:.2f}'),
+        ('avg_trade_pnl', '${avg_trade_pnl:.2f}'),
+        ('avg_win', '${avg_win:.2f}'),
+        ('avg_loss', '${avg_loss:.2f}'),
+        ('largest_win', '${largest_win:.2f}'),
+        ('largest_loss', '${largest_loss:.2f}'),
+        ('avg_holding_time', '{avg_holding_time:.1f}h'),
+        
+        # 多空统计
+        ('long_trades', None),
+        ('short_trades', None),
+        ('long_win_rate', '{long_win_rate:.1f}%'),
+        ('short_win_rate', '{short_win_rate:.1f}%'),
+        ('long_pnl', '${long_pnl:.2f}'),
+        ('short_pnl', '${short_pnl:.2f}'),
+        
+        # 时间统计
+        ('period', '{start_date} to {end_date}'),
+        ('total_days', None),
+        ('trading_days', None),
+    )
+    
+    to_dict = _compile_to_dict(_FIELDS)
 
 
 class PerformanceMetrics:
@@ -118,6 +174,17 @@ class PerformanceMetrics:
     
     RISK_FREE_RATE = 0.02  # 无风险利率 (2%)
     TRADING_DAYS_PER_YEAR = 365  # 加密货币 365 天
+    _MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                    'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    
+    # 交易记录列式布局: side 0=多 1=空, holding_time 缺失为 NaN, date 为日序号
+    _TRADE_DTYPE = np.dtype([
+        ('pnl', np.float64),
+        ('side', np.int8),
+        ('is_close', np.bool_),
+        ('holding_time', np.float64),
+        ('date', np.int64),
+    ])
     
     @classmethod
     def calculate(
@@ -137,41 +204,70 @@ class PerformanceMetrics:
         Returns:
             MetricsResult 对象
         """
+        # 单次遍历交易记录，构建列式数组 (SoA)
+        columns = np.fromiter(
+            (
+                (
+                    t.pnl,
+                    t.side == Side.SHORT,
+                    t.action == "close",
+                    np.nan if t.holding_time is None else t.holding_time,
+                    t.timestamp.toordinal(),
+                )
+                for t in trades
+            ),
+            dtype=cls._TRADE_DTYPE,
+            count=len(trades),
+        )
+        
         # 过滤平仓交易（有 PnL 的交易）
-        closed_trades = [t for t in trades if t.action == "close"]
+        closed = columns[columns['is_close']]
+        pnls = closed['pnl']
+        
+        # 空回测（如参数网格中从未交易的组合）直接返回零值结果
+        if not pnls.size and equity_curve.empty:
+            return cls._empty_result(initial_capital)
+        
+        # 净值与时间索引只提取一次，下游直接使用 numpy 数组
+        # (有平仓交易但净值曲线为空时，各指标按空数组处理)
+        if equity_curve.empty:
+            eq = np.empty(0)
+        else:
+            eq = equity_curve['total_equity'].to_numpy(dtype=np.float64, copy=False)
+        idx_values = equity_curve.index.values
         
         # 计算收益指标
         total_return, annualized_return = cls._calculate_returns(
-            equity_curve, initial_capital
+            eq, idx_values, initial_capital
         )
         
         # 计算最大回撤
-        max_dd, max_dd_pct, max_dd_duration = cls._calculate_max_drawdown(equity_curve)
+        max_dd, max_dd_pct, max_dd_duration = cls._calculate_max_drawdown(eq, idx_values)
         
         # 计算风险指标 (使用总收益率而非年化收益率)
         sharpe, sortino, calmar, volatility = cls._calculate_risk_metrics(
-            equity_curve, total_return, max_dd_pct  # Changed: use total_return
+            eq, total_return, max_dd_pct  # Changed: use total_return
         )
         
         # 计算交易统计
-        trade_stats = cls._calculate_trade_stats(closed_trades)
+        trade_stats = cls._calculate_trade_stats(pnls, closed['holding_time'])
         
         # 计算多空统计
-        long_stats, short_stats = cls._calculate_side_stats(closed_trades)
+        long_stats, short_stats = cls._calculate_side_stats(pnls, closed['side'])
         
         # 时间统计
-        if not equity_curve.empty:
-            start_date = equity_curve.index[0].strftime("%Y-%m-%d")
-            end_date = equity_curve.index[-1].strftime("%Y-%m-%d")
-            total_days = (equity_curve.index[-1] - equity_curve.index[0]).days
+        if idx_values.size:
+            # 直接在 datetime64 数组上计算，避免构造 Timestamp 与 strftime
+            start_date, end_date = np.datetime_as_string(idx_values[[0, -1]], unit='D').tolist()
+            total_days = cls._days_between(idx_values, 0, -1)
         else:
             start_date = end_date = "N/A"
             total_days = 0
         
-        trading_days = len(set(t.timestamp.date() for t in closed_trades))
+        trading_days = np.unique(closed['date']).size if pnls.size else 0
         
         # 计算最终净值和盈亏金额
-        final_equity = equity_curve['total_equity'].iloc[-1] if not equity_curve.empty else initial_capital
+        final_equity = eq[-1] if eq.size else initial_capital
         profit_amount = final_equity - initial_capital
         
         return MetricsResult(
@@ -218,21 +314,44 @@ class PerformanceMetrics:
             trading_days=trading_days,
         )
     
+    @staticmethod
+    def _empty_result(initial_capital: float) -> MetricsResult:
+        """无净值、无平仓交易时的零值结果"""
+        return MetricsResult(
+            total_return=0.0, annualized_return=0.0,
+            final_equity=initial_capital, profit_amount=0.0,
+            max_drawdown=0.0, max_drawdown_pct=0.0, max_drawdown_duration=0,
+            sharpe_ratio=0.0, sortino_ratio=0.0, calmar_ratio=0.0, volatility=0.0,
+            total_trades=0, winning_trades=0, losing_trades=0,
+            win_rate=0.0, profit_factor=0.0, avg_trade_pnl=0.0,
+            avg_win=0.0, avg_loss=0.0, largest_win=0.0, largest_loss=0.0,
+            avg_holding_time=0.0,
+            long_trades=0, short_trades=0, long_win_rate=0.0, short_win_rate=0.0,
+            long_pnl=0.0, short_pnl=0.0,
+            start_date="N/A", end_date="N/A", total_days=0, trading_days=0,
+        )
+    
+    @staticmethod
+    def _days_between(idx_values: np.ndarray, start: int, end: int) -> int:
+        """两个索引位置之间的整天数 (等价于 Timedelta.days)"""
+        return int((idx_values[end] - idx_values[start]) // np.timedelta64(1, 'D'))
+    
     @classmethod
     def _calculate_returns(
         cls,
-        equity_curve: pd.DataFrame,
+        eq: np.ndarray,
+        idx_values: np.ndarray,
         initial_capital: float
     ) -> Tuple[float, float]:
         """计算收益率"""
-        if equity_curve.empty:
+        if not eq.size:
             return 0.0, 0.0
         
-        final_equity = equity_curve['total_equity'].iloc[-1]
+        final_equity = eq[-1]
         total_return = (final_equity - initial_capital) / initial_capital * 100
         
         # 年化收益
-        days = (equity_curve.index[-1] - equity_curve.index[0]).days
+        days = cls._days_between(idx_values, 0, -1)
         if days > 0:
             annualized_return = ((1 + total_return / 100) ** (365 / days) - 1) * 100
         else:
@@ -243,71 +362,67 @@ class PerformanceMetrics:
     @classmethod
     def _calculate_max_drawdown(
         cls,
-        equity_curve: pd.DataFrame
+        eq: np.ndarray,
+        idx_values: np.ndarray
     ) -> Tuple[float, float, int]:
         """计算最大回撤"""
-        if equity_curve.empty:
+        if not eq.size:
             return 0.0, 0.0, 0
         
-        equity = equity_curve['total_equity']
+        # 计算滚动最大值 (单次 O(N) 累积最大值)
+        running_max = np.maximum.accumulate(eq)
+        drawdown = running_max - eq
+        drawdown_pct = drawdown / running_max * 100
         
-        # 计算滚动最大值
-        rolling_max = equity.expanding().max()
-        drawdown = rolling_max - equity
-        drawdown_pct = drawdown / rolling_max * 100
-        
-        max_dd = drawdown.max()
+        end = int(drawdown.argmax())
+        max_dd = drawdown[end]
         max_dd_pct = drawdown_pct.max()
         
         # 计算最大回撤持续时间
         max_dd_duration = 0
         if max_dd > 0:
             # 找到最大回撤开始和结束的位置
-            peak_idx = equity[:drawdown.idxmax()].idxmax()
-            recovery_candidates = equity[drawdown.idxmax():]
-            recovery_candidates = recovery_candidates[recovery_candidates >= equity[peak_idx]]
+            peak = int(eq[:end + 1].argmax())
+            recovered = eq[end:] >= eq[peak]
             
-            if not recovery_candidates.empty:
-                recovery_idx = recovery_candidates.index[0]
-                max_dd_duration = (recovery_idx - peak_idx).days
+            if recovered.any():
+                recovery = end + int(recovered.argmax())
+                max_dd_duration = cls._days_between(idx_values, peak, recovery)
             else:
                 # 尚未恢复
-                max_dd_duration = (equity.index[-1] - peak_idx).days
+                max_dd_duration = cls._days_between(idx_values, peak, -1)
         
         return max_dd, max_dd_pct, max_dd_duration
     
     @classmethod
     def _calculate_risk_metrics(
         cls,
-        equity_curve: pd.DataFrame,
+        eq: np.ndarray,
         total_return: float,  # Changed from annualized_return
         max_dd_pct: float
     ) -> Tuple[float, float, float, float]:
         """计算风险指标"""
-        if equity_curve.empty or len(equity_curve) < 2:
+        if eq.size < 2:
             return 0.0, 0.0, 0.0, 0.0
         
-        # 计算日收益率
-        equity = equity_curve['total_equity']
-        daily_returns = equity.pct_change().dropna()
-        
-        if daily_returns.empty:
-            return 0.0, 0.0, 0.0, 0.0
+        # 单次遍历计算日收益率的波动与下行波动
+        returns_std, downside_std, n, n_neg = _risk_kernel(eq)
+        if n < 2:
+            returns_std = np.nan  # 单个样本无标准差
         
         # 计算回测期间的波动率 (不年化)
-        volatility = daily_returns.std() * 100
+        volatility = returns_std * 100
         
         # 夏普比率 (使用总收益率,不年化)
         # 对于短期回测,使用总收益率更合理
-        risk_free_return = cls.RISK_FREE_RATE * len(daily_returns) / cls.TRADING_DAYS_PER_YEAR * 100
+        risk_free_return = cls.RISK_FREE_RATE * n / cls.TRADING_DAYS_PER_YEAR * 100
         excess_return = total_return - risk_free_return
-        sharpe = excess_return / (volatility * np.sqrt(len(daily_returns))) if volatility > 0 else 0.0
+        sharpe = excess_return / (volatility * np.sqrt(n)) if volatility > 0 else 0.0
         
         # 索提诺比率（只考虑下行波动）
-        negative_returns = daily_returns[daily_returns < 0]
-        if len(negative_returns) > 0:
-            downside_std = negative_returns.std() * 100
-            sortino = excess_return / (downside_std * np.sqrt(len(daily_returns))) if downside_std > 0 else 0.0
+        downside_std *= 100
+        if n_neg > 1 and downside_std > 0:
+            sortino = excess_return / (downside_std * np.sqrt(n))
         else:
             sortino = 0.0
         
@@ -315,14 +430,15 @@ class PerformanceMetrics:
         calmar = total_return / max_dd_pct if max_dd_pct > 0 else 0.0
         
         # 年化波动率 (仅用于显示)
-        annualized_volatility = daily_returns.std() * np.sqrt(cls.TRADING_DAYS_PER_YEAR) * 100
+        annualized_volatility = returns_std * np.sqrt(cls.TRADING_DAYS_PER_YEAR) * 100
         
         return sharpe, sortino, calmar, annualized_volatility
     
     @classmethod
-    def _calculate_trade_stats(cls, trades: List[Trade]) -> Dict:
-        """计算交易统计"""
-        if not trades:
+    def _calculate_trade_stats(cls, pnls: np.ndarray, holding_times: np.ndarray) -> Dict:
+        """计算交易统计 (平仓交易的盈亏与持仓时间数组，缺失持仓时间为 NaN)"""
+        n = pnls.size
+        if not n:
             return {
                 'total': 0, 'winning': 0, 'losing': 0,
                 'win_rate': 0.0, 'profit_factor': 0.0,
@@ -331,77 +447,75 @@ class PerformanceMetrics:
                 'avg_holding_time': 0.0,
             }
         
-        pnls = [t.pnl for t in trades]
-        winning = [p for p in pnls if p > 0]
-        losing = [p for p in pnls if p < 0]
-        holding_times = [t.holding_time for t in trades if t.holding_time is not None]
+        winning = pnls[pnls > 0]
+        losing = pnls[pnls < 0]
+        holding_times = holding_times[~np.isnan(holding_times)]
         
-        total_win = sum(winning) if winning else 0
-        total_loss = abs(sum(losing)) if losing else 0
+        total_win = winning.sum()
+        total_loss = -losing.sum()
         
         return {
-            'total': len(trades),
-            'winning': len(winning),
-            'losing': len(losing),
-            'win_rate': len(winning) / len(trades) * 100 if trades else 0,
+            'total': n,
+            'winning': winning.size,
+            'losing': losing.size,
+            'win_rate': winning.size / n * 100,
             'profit_factor': total_win / total_loss if total_loss > 0 else float('inf'),
-            'avg_pnl': sum(pnls) / len(pnls) if pnls else 0,
-            'avg_win': sum(winning) / len(winning) if winning else 0,
-            'avg_loss': sum(losing) / len(losing) if losing else 0,
-            'largest_win': max(pnls) if pnls else 0,
-            'largest_loss': min(pnls) if pnls else 0,
-            'avg_holding_time': sum(holding_times) / len(holding_times) if holding_times else 0,
+            'avg_pnl': pnls.mean(),
+            'avg_win': winning.mean() if winning.size else 0,
+            'avg_loss': losing.mean() if losing.size else 0,
+            'largest_win': pnls.max(),
+            'largest_loss': pnls.min(),
+            'avg_holding_time': holding_times.mean() if holding_times.size else 0,
         }
     
     @classmethod
-    def _calculate_side_stats(cls, trades: List[Trade]) -> Tuple[Dict, Dict]:
-        """计算多空分类统计"""
-        long_trades = [t for t in trades if t.side == Side.LONG]
-        short_trades = [t for t in trades if t.side == Side.SHORT]
-        
-        def calc_side(trade_list):
-            if not trade_list:
-                return {'count': 0, 'win_rate': 0.0, 'total_pnl': 0.0}
-            
-            winning = sum(1 for t in trade_list if t.pnl > 0)
-            total_pnl = sum(t.pnl for t in trade_list)
-            
-            return {
-                'count': len(trade_list),
-                'win_rate': winning / len(trade_list) * 100,
-                'total_pnl': total_pnl,
-            }
+    def _calculate_side_stats(cls, pnls: np.ndarray, sides: np.ndarray) -> Tuple[Dict, Dict]:
+        """计算多空分类统计 (sides: 0=多, 1=空)"""
+        is_long = sides == 0
         
-        return calc_side(long_trades), calc_side(short_trades)
+        return cls._side_summary(pnls[is_long]), cls._side_summary(pnls[~is_long])
+    
+    @staticmethod
+    def _side_summary(pnls: np.ndarray) -> Dict:
+        """单方向统计"""
+        if not pnls.size:
+            return {'count': 0, 'win_rate': 0.0, 'total_pnl': 0.0}
+        
+        return {
+            'count': pnls.size,
+            'win_rate': (pnls > 0).mean() * 100,
+            'total_pnl': pnls.sum(),
+        }
     
     @classmethod
     def generate_monthly_returns(cls, equity_curve: pd.DataFrame) -> pd.DataFrame:
-        """生成月度收益统计"""
+        """生成月度收益统计（年 x 月透视表）"""
         if equity_curve.empty:
             return pd.DataFrame()
         
-        equity = equity_curve['total_equity']
-        
-        # 重采样到月度
-        monthly = equity.resample('M').last()
-        monthly_returns = monthly.pct_change() * 100
+        eq = equity_curve['total_equity'].to_numpy(dtype=np.float64, copy=False)
+        # 自 1970-01 起的月序号 (year*12 + month)
+        ym = equity_curve.index.values.astype('datetime64[M]').astype(np.int64)
         
-        # 转换为透视表格式（年 x 月）
-        monthly_returns = monthly_returns.dropna()
-        if monthly_returns.empty:
+        # 索引有序：每月最后一个点 = 下一个月首点的前一位
+        months, first = np.unique(ym, return_index=True)
+        if months.size < 2:
             return pd.DataFrame()
-        
-        df = pd.DataFrame({
-            'year': monthly_returns.index.year,
-            'month': monthly_returns.index.month,
-            'return': monthly_returns.values
-        })
-        
-        pivot = df.pivot(index='year', columns='month', values='return')
-        pivot.columns = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                         'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][:len(pivot.columns)]
-        
-        return pivot
+        last = np.append(first[1:] - 1, ym.size - 1)
+        monthly = eq[last]
+        monthly_returns = (monthly[1:] / monthly[:-1] - 1) * 100
+        months = months[1:]
+        
+        # 直接散点写入透视表
+        years = months // 12
+        year0 = years[0]
+        table = np.full((years[-1] - year0 + 1, 12), np.nan)
+        table[years - year0, months % 12] = monthly_returns
+        
+        pivot = pd.DataFrame(table, index=pd.Index(np.arange(year0, years[-1] + 1) + 1970, name='year'),
+                             columns=cls._MONTH_NAMES)
+        # 去掉无数据的年份
+        return pivot[~np.isnan(table).all(axis=1)]
 
 
 # 测试函数
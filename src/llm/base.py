@@ -7,13 +7,44 @@ LLM 抽象基类和配置
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
 from typing import Dict, Any, Optional, List
+import asyncio
 import httpx
+import random
+import threading
 import time
 
 from src.llm.metrics import record_error, record_request, record_success
+from src.utils.json_utils import fast_json_dumps
 import re
 
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# 进程内共享的同步 HTTP 客户端（连接池 + keep-alive，避免每个实例重复 TLS 握手）
+_SHARED_CLIENT: Optional[httpx.Client] = None
+_SHARED_CLIENT_LOCK = threading.Lock()
+
+
+def _shared_client() -> httpx.Client:
+    """获取共享的 httpx.Client（首次调用时创建）"""
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None or _SHARED_CLIENT.is_closed:
+        with _SHARED_CLIENT_LOCK:
+            if _SHARED_CLIENT is None or _SHARED_CLIENT.is_closed:
+                _SHARED_CLIENT = httpx.Client(
+                    timeout=120,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                )
+    return _SHARED_CLIENT
+
 
 @dataclass
 class LLMConfig:
@@ -25,13 +56,14 @@ class LLMConfig:
     max_retries: int = 5
     temperature: float = 0.7
     max_tokens: int = 4096
+    keep_raw_response: bool = False  # 保留完整响应 JSON（调试用，长回测会占用大量内存）
     
     def __post_init__(self):
         if not self.api_key:
             raise ValueError("api_key is required")
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """聊天消息"""
     role: str  # "system", "user", "assistant"
@@ -60,6 +92,10 @@ class BaseLLMClient(ABC):
     DEFAULT_MODEL: str = ""
     PROVIDER: str = "base"
     
+    # 重试退避 (decorrelated jitter): wait = min(cap, uniform(base, prev_wait * 3))
+    RETRY_BASE_DELAY: float = 1.0
+    RETRY_MAX_DELAY: float = 30.0
+    
     def __init__(self, config: LLMConfig):
         """
         初始化 LLM 客户端
@@ -70,7 +106,19 @@ class BaseLLMClient(ABC):
         self.config = config
         self.base_url = config.base_url or self.DEFAULT_BASE_URL
         self.model = config.model or self.DEFAULT_MODEL
-        self.client = httpx.Client(timeout=config.timeout)
+        self.client = _shared_client()
+        self._async_client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """异步 HTTP 客户端（首次使用时创建，HTTP/2 多路复用共享连接）"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                http2=HAS_HTTP2,
+                limits=httpx.Limits(max_connections=32),
+            )
+        return self._async_client
     
     @abstractmethod
     def _build_headers(self) -> Dict[str, str]:
@@ -154,73 +202,180 @@ class BaseLLMClient(ABC):
         url = self._build_url()
         headers = self._build_headers()
         body = self._build_request_body(messages, **kwargs)
+        payload = fast_json_dumps(body)  # 只序列化一次，重试复用
+        headers.setdefault("Content-Type", "application/json")
         
         last_error = None
+        wait_time = self.RETRY_BASE_DELAY
         for attempt in range(self.config.max_retries):
             try:
                 record_request(self.PROVIDER, self.model)
                 est_prompt_tokens = self._estimate_prompt_tokens(messages)
                 start_ts = time.time()
-                response = self.client.post(url, json=body, headers=headers)
+                response = self.client.post(
+                    url, content=payload, headers=headers, timeout=self.config.timeout
+                )
                 response.raise_for_status()
-                parsed = self._parse_response(response.json())
-                usage = parsed.usage or {}
-                prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
-                completion_tokens = int(usage.get("completion_tokens", 0) or 0)
-                total_tokens = int(usage.get("total_tokens", 0) or 0)
-                if total_tokens <= 0:
-                    if prompt_tokens <= 0:
-                        prompt_tokens = est_prompt_tokens
-                    if completion_tokens <= 0:
-                        completion_tokens = self._estimate_tokens(parsed.content or "")
-                    total_tokens = prompt_tokens + completion_tokens
-                    parsed.usage = {
-                        "prompt_tokens": prompt_tokens,
-                        "completion_tokens": completion_tokens,
-                        "total_tokens": total_tokens
-                    }
-                latency_ms = int((time.time() - start_ts) * 1000)
-                record_success(self.PROVIDER, self.model, latency_ms, parsed.usage)
-                return parsed
-            except httpx.HTTPStatusError as e:
-                last_error = e
-                record_error(self.PROVIDER, self.model, f"HTTP {e.response.status_code}")
-                if e.response.status_code in [429, 500, 502, 503, 504]:
-                    # 可重试的 HTTP 错误
-                    wait_time = 2 ** attempt
-                    print(f"⚠️ LLM HTTP Error {e.response.status_code}, retrying in {wait_time}s (attempt {attempt + 1}/{self.config.max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                raise
-            except (httpx.ConnectError, httpx.ReadError, httpx.WriteError, 
-                    ConnectionResetError, ConnectionError, OSError) as e:
-                # 网络连接错误，需要重试
+                return self._finalize_response(response.json(), est_prompt_tokens, start_ts)
+            except Exception as e:
                 last_error = e
-                record_error(self.PROVIDER, self.model, type(e).__name__)
-                wait_time = 2 ** attempt
-                print(f"⚠️ LLM Connection Error: {type(e).__name__}, retrying in {wait_time}s (attempt {attempt + 1}/{self.config.max_retries})")
+                wait_time = self._retry_wait(e, attempt, wait_time)
                 time.sleep(wait_time)
-                continue
+        
+        raise last_error or Exception("Max retries exceeded")
+
+    async def chat_async(
+        self, 
+        system_prompt: str, 
+        user_prompt: str,
+        **kwargs
+    ) -> LLMResponse:
+        """chat 的异步版本，可配合 asyncio.gather 并发请求"""
+        messages = [
+            ChatMessage(role="system", content=system_prompt),
+            ChatMessage(role="user", content=user_prompt)
+        ]
+        return await self.chat_messages_async(messages, **kwargs)
+
+    async def chat_messages_async(
+        self, 
+        messages: List[ChatMessage],
+        **kwargs
+    ) -> LLMResponse:
+        """
+        多轮对话调用（异步版本）
+        
+        与 chat_messages 逻辑一致，但使用 AsyncClient 且重试等待不阻塞事件循环。
+        """
+        url = self._build_url()
+        headers = self._build_headers()
+        body = self._build_request_body(messages, **kwargs)
+        payload = fast_json_dumps(body)  # 只序列化一次，重试复用
+        headers.setdefault("Content-Type", "application/json")
+        
+        last_error = None
+        wait_time = self.RETRY_BASE_DELAY
+        for attempt in range(self.config.max_retries):
+            try:
+                record_request(self.PROVIDER, self.model)
+                est_prompt_tokens = self._estimate_prompt_tokens(messages)
+                start_ts = time.time()
+                response = await self.async_client.post(url, content=payload, headers=headers)
+                response.raise_for_status()
+                return self._finalize_response(response.json(), est_prompt_tokens, start_ts)
             except Exception as e:
                 last_error = e
-                record_error(self.PROVIDER, self.model, type(e).__name__)
-                # 其他未知错误，最后一次尝试后抛出
-                if attempt < self.config.max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"⚠️ LLM Unexpected Error: {type(e).__name__}: {e}, retrying in {wait_time}s")
-                    time.sleep(wait_time)
-                    continue
-                raise
+                wait_time = self._retry_wait(e, attempt, wait_time)
+                await asyncio.sleep(wait_time)
         
         raise last_error or Exception("Max retries exceeded")
 
+    def _finalize_response(
+        self,
+        response: Dict[str, Any],
+        est_prompt_tokens: int,
+        start_ts: float
+    ) -> LLMResponse:
+        """解析响应、补全 usage 估算并记录成功指标"""
+        parsed = self._parse_response(response)
+        if not self.config.keep_raw_response:
+            parsed.raw_response = None
+        usage = parsed.usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+        completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+        total_tokens = int(usage.get("total_tokens", 0) or 0)
+        if total_tokens <= 0:
+            if prompt_tokens <= 0:
+                prompt_tokens = est_prompt_tokens
+            if completion_tokens <= 0:
+                completion_tokens = self._estimate_tokens(parsed.content or "")
+            total_tokens = prompt_tokens + completion_tokens
+            parsed.usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens
+            }
+        latency_ms = int((time.time() - start_ts) * 1000)
+        record_success(self.PROVIDER, self.model, latency_ms, parsed.usage)
+        return parsed
+
+    def _backoff(self, prev_wait: float) -> float:
+        """Decorrelated jitter 退避，避免并发重试同时打到服务端"""
+        # Retry-After: 0 或过去的日期会把上次等待置 0，退避下限仍为基础延迟
+        prev_wait = max(self.RETRY_BASE_DELAY, prev_wait)
+        return min(self.RETRY_MAX_DELAY, random.uniform(self.RETRY_BASE_DELAY, prev_wait * 3))
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        """解析 Retry-After 响应头（秒数或 HTTP 日期），上限 RETRY_MAX_DELAY"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.RETRY_MAX_DELAY)
+
+    def _retry_wait(self, error: Exception, attempt: int, prev_wait: float) -> float:
+        """
+        记录失败的请求并返回重试前的等待秒数
+        
+        不可重试的错误（或最后一次尝试的未知错误）直接重新抛出。
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            status_code = error.response.status_code
+            record_error(self.PROVIDER, self.model, f"HTTP {status_code}")
+            if status_code in RETRYABLE_STATUS_CODES:
+                # 可重试的 HTTP 错误，429/503 优先遵循服务端 Retry-After
+                wait_time = None
+                if status_code in (429, 503):
+                    wait_time = self._retry_after(error.response)
+                if wait_time is None:
+                    wait_time = self._backoff(prev_wait)
+                print(f"⚠️ LLM HTTP Error {status_code}, retrying in {wait_time:.1f}s (attempt {attempt + 1}/{self.config.max_retries})")
+                return wait_time
+            raise error
+        
+        if isinstance(error, (httpx.ConnectError, httpx.ReadError, httpx.WriteError, 
+                              ConnectionResetError, ConnectionError, OSError)):
+            # 网络连接错误，需要重试
+            record_error(self.PROVIDER, self.model, type(error).__name__)
+            wait_time = self._backoff(prev_wait)
+            print(f"⚠️ LLM Connection Error: {type(error).__name__}, retrying in {wait_time:.1f}s (attempt {attempt + 1}/{self.config.max_retries})")
+            return wait_time
+        
+        record_error(self.PROVIDER, self.model, type(error).__name__)
+        # 其他未知错误，最后一次尝试后抛出
+        if attempt < self.config.max_retries - 1:
+            wait_time = self._backoff(prev_wait)
+            print(f"⚠️ LLM Unexpected Error: {type(error).__name__}: {error}, retrying in {wait_time:.1f}s")
+            return wait_time
+        raise error
+
     
     def close(self):
-        """关闭 HTTP 客户端"""
-        self.client.close()
+        """关闭 HTTP 客户端（共享连接池不关闭，由进程退出时回收）"""
+        if self.client is not _SHARED_CLIENT:
+            self.client.close()
+    
+    async def aclose(self):
+        """关闭 HTTP 客户端（含异步客户端）"""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
     
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
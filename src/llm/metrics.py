@@ -1,9 +1,10 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from threading import Lock
+from time import time as _now
 from typing import Dict, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMStats:
     total_requests: int = 0
     total_success: int = 0
@@ -18,6 +19,8 @@ class LLMStats:
     total_input_tokens: int = 0
     total_output_tokens: int = 0
     total_tokens: int = 0
+    # Per-entry lock, excluded from to_dict
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False, compare=False)
 
     def to_dict(self) -> Dict[str, Any]:
         avg_latency_ms = 0
@@ -26,14 +29,26 @@ class LLMStats:
         token_speed_tps = 0.0
         if self.total_latency_ms > 0 and self.total_tokens > 0:
             token_speed_tps = self.total_tokens / (self.total_latency_ms / 1000.0)
-        data = asdict(self)
-        data.update({
+        return {
+            "total_requests": self.total_requests,
+            "total_success": self.total_success,
+            "total_errors": self.total_errors,
+            "last_latency_ms": self.last_latency_ms,
+            "total_latency_ms": self.total_latency_ms,
+            "min_latency_ms": self.min_latency_ms,
+            "max_latency_ms": self.max_latency_ms,
+            "last_error": self.last_error,
+            "last_request_ts": self.last_request_ts,
+            "last_success_ts": self.last_success_ts,
+            "total_input_tokens": self.total_input_tokens,
+            "total_output_tokens": self.total_output_tokens,
+            "total_tokens": self.total_tokens,
             "avg_latency_ms": avg_latency_ms,
             "token_speed_tps": round(token_speed_tps, 2)
-        })
-        return data
+        }
 
 
+# Guards creation of stats entries only; updates take the per-entry lock
 _lock = Lock()
 _stats_by_provider: Dict[str, LLMStats] = {}
 _stats_by_model: Dict[str, LLMStats] = {}
@@ -42,55 +57,69 @@ _stats_by_model: Dict[str, LLMStats] = {}
 def _get_or_create(map_ref: Dict[str, LLMStats], key: str) -> LLMStats:
     stat = map_ref.get(key)
     if stat is None:
-        stat = LLMStats()
-        map_ref[key] = stat
+        with _lock:
+            stat = map_ref.get(key)
+            if stat is None:
+                stat = LLMStats()
+                map_ref[key] = stat
     return stat
 
 
 def record_request(provider: str, model: str):
-    with _lock:
-        for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
-            stat = _get_or_create(store, key)
+    now = _now()
+    for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
+        stat = _get_or_create(store, key)
+        with stat._lock:
             stat.total_requests += 1
-            stat.last_request_ts = __import__("time").time()
+            stat.last_request_ts = now
 
 
 def record_success(provider: str, model: str, latency_ms: int, usage: Dict[str, Any] = None):
-    with _lock:
-        for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
-            stat = _get_or_create(store, key)
+    now = _now()
+    latency_ms = int(latency_ms)
+    usage = usage or {}
+    prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+    completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+    total_tokens = int(usage.get("total_tokens", 0) or 0)
+    if total_tokens <= 0:
+        total_tokens = prompt_tokens + completion_tokens
+
+    for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
+        stat = _get_or_create(store, key)
+        with stat._lock:
             stat.total_success += 1
-            stat.last_latency_ms = int(latency_ms)
-            stat.last_success_ts = __import__("time").time()
+            stat.last_latency_ms = latency_ms
+            stat.last_success_ts = now
             stat.last_error = ""
-            stat.total_latency_ms += int(latency_ms)
+            stat.total_latency_ms += latency_ms
             if stat.min_latency_ms == 0 or latency_ms < stat.min_latency_ms:
-                stat.min_latency_ms = int(latency_ms)
+                stat.min_latency_ms = latency_ms
             if latency_ms > stat.max_latency_ms:
-                stat.max_latency_ms = int(latency_ms)
-
-            usage = usage or {}
-            prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
-            completion_tokens = int(usage.get("completion_tokens", 0) or 0)
-            total_tokens = int(usage.get("total_tokens", 0) or 0)
-            if total_tokens <= 0:
-                total_tokens = prompt_tokens + completion_tokens
+                stat.max_latency_ms = latency_ms
             stat.total_input_tokens += prompt_tokens
             stat.total_output_tokens += completion_tokens
             stat.total_tokens += total_tokens
 
 
 def record_error(provider: str, model: str, error: str):
-    with _lock:
-        for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
-            stat = _get_or_create(store, key)
+    for key, store in ((provider, _stats_by_provider), (model, _stats_by_model)):
+        stat = _get_or_create(store, key)
+        with stat._lock:
             stat.total_errors += 1
             stat.last_error = error
 
 
+def _stat_dict(stat: LLMStats) -> Dict[str, Any]:
+    with stat._lock:
+        return stat.to_dict()
+
+
 def snapshot() -> Dict[str, Any]:
+    # 全局锁内只复制条目引用，逐条序列化在锁外进行（各条目自带锁）
     with _lock:
-        return {
-            "providers": {k: v.to_dict() for k, v in _stats_by_provider.items()},
-            "models": {k: v.to_dict() for k, v in _stats_by_model.items()},
-        }
+        providers = list(_stats_by_provider.items())
+        models = list(_stats_by_model.items())
+    return {
+        "providers": {k: _stat_dict(v) for k, v in providers},
+        "models": {k: _stat_dict(v) for k, v in models},
+    }
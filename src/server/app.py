@@ -6,6 +6,7 @@ import os
 import secrets
 import json
 import inspect
+from itertools import islice
 from typing import Optional, Dict, List, Any
 from dataclasses import asdict
 from pathlib import Path
@@ -264,8 +265,9 @@ async def get_status(authenticated: bool = Depends(verify_auth)):
     with global_state.locked():
         log_tail = 200
         simplified_tail = 300
-        logs_tail = global_state.recent_logs[-log_tail:]
-        simplified_logs = _filter_simplified_logs(global_state.recent_logs[-simplified_tail:])
+        recent_logs = list(global_state.recent_logs)
+        logs_tail = recent_logs[-log_tail:]
+        simplified_logs = _filter_simplified_logs(recent_logs[-simplified_tail:])
         if len(simplified_logs) > log_tail:
             simplified_logs = simplified_logs[-log_tail:]
 
@@ -327,7 +329,7 @@ async def get_status(authenticated: bool = Depends(verify_auth)):
                 "initial_balance": global_state.initial_balance
             },
             "decision": global_state.latest_decision,
-            "decision_history": global_state.decision_history[:10],
+            "decision_history": list(islice(global_state.decision_history, 10)),
             "trade_history": global_state.trade_history[:200],
             "logs": logs_tail,
             "logs_simplified": simplified_logs,
@@ -386,7 +388,7 @@ async def control_bot(cmd: ControlCommand, authenticated: bool = Depends(verify_
             global_state.cycle_positions_opened = 0
             # 🆕 清空交易记录，防止使用历史数据进行复盘
             global_state.trade_history = []
-            global_state.decision_history = []
+            global_state.clear_decision_history()
             global_state.balance_history = []
             switch_handler = getattr(global_state, "mode_switch_handler", None)
             if callable(switch_handler):
@@ -496,7 +498,7 @@ async def test_log(authenticated: bool = Depends(verify_auth)):
     return {
         "status": "success",
         "logs_count": len(global_state.recent_logs),
-        "latest_logs": global_state.recent_logs[-5:] if global_state.recent_logs else []
+        "latest_logs": list(global_state.recent_logs)[-5:]
     }
 
 @app.get("/api/symbol_stats")
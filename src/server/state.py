@@ -1,11 +1,23 @@
 from src.utils.logger import log
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Deque, List, Optional
 from dataclasses import dataclass, field
-from datetime import datetime
+from collections import deque
 import json
 import threading
+import time
 
-@dataclass
+
+def _now_hms() -> str:
+    """Local wall-clock time as HH:MM:SS."""
+    return time.strftime("%H:%M:%S")
+
+
+def _now_str() -> str:
+    """Local wall-clock time as YYYY-MM-DD HH:MM:SS (time.strftime is cheaper than datetime.now().strftime)."""
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass(slots=True)
 class SharedState:
     """Global state shared between Trading Loop and API Server"""
     
@@ -66,17 +78,20 @@ class SharedState:
     demo_limit_seconds: int = 20 * 60  # 20 minutes in seconds
     
     # Chart Data
-    equity_history: List[Dict] = field(default_factory=list)  # [{'time': '12:00', 'value': 1000}, ...]
+    # Equity curve stored column-wise (last 200 points); see equity_history for the row view
+    equity_times: Deque[str] = field(default_factory=lambda: deque(maxlen=200))
+    equity_values: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    equity_cycles: Deque[int] = field(default_factory=lambda: deque(maxlen=200))
     balance_history: List[Dict] = field(default_factory=list)  # [{time, balance, pnl, action}]
     initial_balance: float = 0.0  # Initial balance when trading started
     
     # Latest Decision & History
     latest_decision: Dict[str, Any] = field(default_factory=dict) # Keyed by symbol now
-    decision_history: List[Dict] = field(default_factory=list)
+    decision_history: Deque[Dict] = field(default_factory=lambda: deque(maxlen=100))  # Newest first
     
     # History
     trade_history: List[Dict] = field(default_factory=list)
-    recent_logs: List[str] = field(default_factory=list)
+    recent_logs: Deque[str] = field(default_factory=lambda: deque(maxlen=500))
     
     # Reflection Agent State
     reflection_count: int = 0
@@ -99,18 +114,41 @@ class SharedState:
     agent_prompts: Dict[str, str] = field(default_factory=dict)
     llm_info: Dict[str, str] = field(default_factory=dict)
     agent_settings: Dict[str, Any] = field(default_factory=dict)
+    agent_config: Optional[Dict[str, Any]] = None  # Runtime agent toggles (set by main loop / API)
+    
+    # Latest analysis results published by the trading loop
+    semantic_analyses: Dict[str, Any] = field(default_factory=dict)
+    four_layer_result: Dict[str, Any] = field(default_factory=dict)
+    saver: Any = field(default=None, repr=False)  # DataSaver shared with agents for log persistence
+    
+    # slots=True: every attribute must be declared as a field above
     _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
 
     def locked(self):
         """Expose state lock for atomic external read/write blocks."""
         return self._lock
-    
+
+    @property
+    def equity_history(self) -> List[Dict]:
+        """Equity curve as rows: [{'time': ..., 'value': ..., 'cycle': ...}, ...]"""
+        with self._lock:
+            return [
+                {'time': t, 'value': v, 'cycle': c}
+                for t, v, c in zip(self.equity_times, self.equity_values, self.equity_cycles)
+            ]
+
+    def _push_equity(self, timestamp: str, value: float, cycle: int):
+        """Append one equity point (caller holds the lock)."""
+        self.equity_times.append(timestamp)
+        self.equity_values.append(value)
+        self.equity_cycles.append(cycle)
+
     def update_market(self, symbol: str, price: float, regime: str, position: str):
         with self._lock:
             self.current_price[symbol] = price
             self.market_regime[symbol] = regime
             self.price_position[symbol] = position
-            self.last_update = datetime.now().strftime("%H:%M:%S")
+            self.last_update = _now_hms()
 
     def update_account(self, equity: float, available: float, wallet: float, pnl: float):
         with self._lock:
@@ -121,18 +159,18 @@ class SharedState:
                 "total_pnl": pnl
             }
             # Add to history (Real-time PnL tracking)
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            if not self.equity_history or self.equity_history[-1]['time'] != timestamp:
-                self.equity_history.append({
-                    'time': timestamp,
-                    'value': equity,
-                    'cycle': self.cycle_counter
-                })
+            timestamp = _now_str()
 
-                # Keep last 200 points (e.g. ~10-20 mins of real-time data or 200 minutes of slow data)
-                if len(self.equity_history) > 200:
-                    self.equity_history.pop(0)
+            # Keeps last 200 points via maxlen (e.g. ~10-20 mins of real-time data or 200 minutes of slow data).
+            # Idle ticks (unchanged equity) are skipped; a change within the same second replaces the last point.
+            if not self.equity_times:
+                self._push_equity(timestamp, equity, self.cycle_counter)
+            elif abs(self.equity_values[-1] - equity) > 1e-6:
+                if self.equity_times[-1] == timestamp:
+                    self.equity_values[-1] = equity
+                    self.equity_cycles[-1] = self.cycle_counter
+                else:
+                    self._push_equity(timestamp, equity, self.cycle_counter)
 
     def _serialize_obj(self, obj):
         """Recursively serialize non-JSON-compatible types (datetime, numpy, pd.Timestamp)"""
@@ -159,8 +197,6 @@ class SharedState:
 
     def update_decision(self, decision: Dict):
         """Update the latest decision and add to history"""
-        from datetime import datetime
-        
         # Clean non-serializable objects to prevent JSON errors
         decision = self._serialize_obj(decision)
         with self._lock:
@@ -169,15 +205,19 @@ class SharedState:
             self.critic_confidence[symbol] = decision.get('confidence', 0.0)
 
             # Add timestamp to decision if not present
+            ts = _now_hms()
             if 'timestamp' not in decision:
-                decision['timestamp'] = datetime.now().strftime("%H:%M:%S")
+                decision['timestamp'] = ts
 
-            # Add to history
-            self.decision_history.insert(0, decision)  # Prepend
-            if len(self.decision_history) > 100:
-                self.decision_history.pop()
+            # Add to history (prepend; maxlen drops the oldest)
+            self.decision_history.appendleft(decision)
 
-            self.last_update = datetime.now().strftime("%H:%M:%S")
+            self.last_update = ts
+
+    def clear_decision_history(self):
+        """Drop all recorded decisions (e.g. when trading restarts)."""
+        with self._lock:
+            self.decision_history.clear()
 
     def add_agent_message(self, agent: str, content: str, role: str = "assistant", level: str = "info", symbol: Optional[str] = None):
         """Add a message to the multi-agent chatroom"""
@@ -188,7 +228,7 @@ class SharedState:
             if last_content == content and last_cycle == self.cycle_counter:
                 return
 
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
             message = {
                 "timestamp": timestamp,
                 "agent": agent,
@@ -237,7 +277,7 @@ class SharedState:
             if self.is_test_mode:
                 self.virtual_initial_balance = initial_balance
                 self.virtual_balance = balance
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
             # Add initial point to balance history
             self.balance_history.append({
                 'time': timestamp,
@@ -248,18 +288,14 @@ class SharedState:
                 'cycle': 0
             })
             # Add initial point to equity history (for Net Value Curve)
-            self.equity_history.append({
-                'time': timestamp,
-                'value': balance,
-                'cycle': 0
-            })
+            self._push_equity(timestamp, balance, 0)
         log.info(f"[📊 SYSTEM] Balance tracking initialized: ${balance:.2f}")
     
     def record_trade(self, trade: Dict):
         """Record a trade and update balance history."""
         with self._lock:
             # Add to trade history
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
             trade['recorded_at'] = timestamp
             self.trade_history.insert(0, trade)  # Prepend (newest first)
 
@@ -297,7 +333,6 @@ class SharedState:
     
     def record_account_success(self):
         """Record successful account info fetch"""
-        import time
         with self._lock:
             self.account_failure_count = 0
             self.account_last_success_time = time.time()
@@ -305,7 +340,6 @@ class SharedState:
     
     def record_account_failure(self):
         """Record failed account info fetch"""
-        import time
         with self._lock:
             self.account_failure_count += 1
             
@@ -318,14 +352,12 @@ class SharedState:
     
     def add_log(self, message: str):
         with self._lock:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
             # Ensure message has timestamp if not present
             if not message.startswith("["):
                 message = f"[{timestamp}] {message}"
                 
             self.recent_logs.append(message)
-            if len(self.recent_logs) > 500:
-                self.recent_logs.pop(0)
     
     def clear_init_logs(self):
         """Clear initialization logs when Cycle 1 starts to sync with Recent Decisions."""
@@ -333,7 +365,7 @@ class SharedState:
             self.recent_logs.clear()
             # Log the fresh start
             msg = "[📊 SYSTEM] Cleared initialization logs - starting fresh from Cycle 1"
-            self.recent_logs.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+            self.recent_logs.append(f"[{_now_str()}] {msg}")
         log.info(msg)
     
     def register_log_sink(self):
@@ -353,14 +385,12 @@ class SharedState:
             # Directly append to recent_logs
             with self._lock:
                 self.recent_logs.append(formatted)
-                if len(self.recent_logs) > 500:
-                    self.recent_logs.pop(0)
         
         # Add sink for INFO and above
         log.add(sink, level="INFO")
 
 # Global Singleton
 global_state = SharedState()
-global_state.start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+global_state.start_time = _now_str()
 # Auto-register the sink
 global_state.register_log_sink()
@@ -0,0 +1,180 @@
+"""
+优化版策略 V2 的指标计算内核
+===========================
+
+EMA / MACD / Wilder RSI / 布林带 / ATR / 成交量均值在一个编译函数内完成，
+供 calculate_indicators 调用；seed_state 为 IndicatorState 冷启动给出递推状态。
+未安装 numba 时按普通 Python 运行，结果一致。
+"""
+
+import numpy as np
+
+from src.utils.jit import njit
+
+# 不开启 nnan/ninf：样本不足时需要按 pandas 语义输出 NaN
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True)
+def rsi_value(avg_gain, avg_loss):
+    """由平均涨幅/跌幅计算 RSI（跌幅为 0 时按 1e-10 处理）"""
+    return 100 - 100 / (1 + avg_gain / max(avg_loss, 1e-10))
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True)
+def _wilder_rsi(c, period):
+    """
+    Wilder 平滑 RSI：前 period 个涨跌幅取简单均值，之后 avg = (avg*(period-1) + x) / period
+
+    Returns:
+        (rsi, rsi_prev)，样本不足时为 NaN
+    """
+    n = c.shape[0] - 1  # 涨跌幅个数
+    if period <= 0 or n < period:
+        return np.nan, np.nan
+    gain = 0.0
+    loss = 0.0
+    for i in range(1, period + 1):
+        d = c[i] - c[i - 1]
+        if d > 0:
+            gain += d
+        else:
+            loss -= d
+    gain /= period
+    loss /= period
+    prev = np.nan
+    for i in range(period + 1, n + 1):
+        prev = rsi_value(gain, loss)
+        d = c[i] - c[i - 1]
+        gain = (gain * (period - 1) + (d if d > 0 else 0.0)) / period
+        loss = (loss * (period - 1) + (-d if d < 0 else 0.0)) / period
+    return rsi_value(gain, loss), prev
+
+
+@njit(cache=True, nogil=True)
+def seed_state(c, rsi_n, ef, es):
+    """
+    按 IndicatorState.update 的顺序递推整段收盘价，得到 EMA / MACD / Wilder RSI 状态
+
+    不开启 fastmath，逐步运算与 Python 递推完全一致，之后可无缝接着增量更新。
+
+    Returns:
+        (ema_fast, ema_slow, ema_12, ema_26, macd_signal, avg_gain, avg_loss, rsi_count)
+    """
+    a_fast = 2.0 / (ef + 1)
+    a_slow = 2.0 / (es + 1)
+    e_fast = c[0]
+    e_slow = c[0]
+    e12 = c[0]
+    e26 = c[0]
+    signal = 0.0
+    gain = 0.0
+    loss = 0.0
+    count = 0
+    for i in range(1, c.shape[0]):
+        x = c[i]
+        e_fast += a_fast * (x - e_fast)
+        e_slow += a_slow * (x - e_slow)
+        e12 += 2.0 / 13 * (x - e12)
+        e26 += 2.0 / 27 * (x - e26)
+        signal += 0.2 * (e12 - e26 - signal)
+        d = x - c[i - 1]
+        g = d if d > 0 else 0.0
+        l = -d if d < 0 else 0.0
+        if count < rsi_n:
+            gain += g
+            loss += l
+            count += 1
+            if count == rsi_n:
+                gain /= rsi_n
+                loss /= rsi_n
+        else:
+            gain = (gain * (rsi_n - 1) + g) / rsi_n
+            loss = (loss * (rsi_n - 1) + l) / rsi_n
+    return e_fast, e_slow, e12, e26, signal, gain, loss, count
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True)
+def compute(c, h, l, v, rsi_n, ef, es, bbp, atrn, bb_k):
+    """
+    计算尾部窗口的全部指标
+
+    Args:
+        c, h, l, v: 收盘/最高/最低/成交量 (float64, 按时间升序)
+        rsi_n, ef, es, bbp, atrn: RSI / 快慢 EMA / 布林带 / ATR 周期
+        bb_k: 布林带标准差倍数
+
+    Returns:
+        (ema_fast, ema_fast_prev, ema_slow, ema_slow_prev, rsi, rsi_prev,
+         macd_hist, macd_hist_prev, bb_upper, bb_lower, bb_mid, atr, avg_volume)
+    """
+    n = c.shape[0]
+
+    # 1) EMA(fast/slow/12/26) 与 MACD 信号线 (adjust=False)
+    a_fast = 2.0 / (ef + 1)
+    a_slow = 2.0 / (es + 1)
+    e_fast = c[0]
+    e_slow = c[0]
+    e12 = c[0]
+    e26 = c[0]
+    signal = 0.0
+    p_fast = np.nan
+    p_slow = np.nan
+    p_hist = np.nan
+    for i in range(1, n):
+        x = c[i]
+        p_fast = e_fast
+        p_slow = e_slow
+        p_hist = e12 - e26 - signal
+        e_fast += a_fast * (x - e_fast)
+        e_slow += a_slow * (x - e_slow)
+        e12 += 2.0 / 13 * (x - e12)
+        e26 += 2.0 / 27 * (x - e26)
+        signal += 0.2 * (e12 - e26 - signal)
+    hist = e12 - e26 - signal
+
+    # 2) Wilder RSI（当前与上一根）
+    rsi, rsi_prev = _wilder_rsi(c, rsi_n)
+
+    # 3) 布林带（样本标准差 ddof=1；窗口内全部相同时宽度为 0）
+    bb_mid = np.nan
+    bb_std = np.nan
+    if n >= bbp > 0:
+        lo = c[n - bbp]
+        hi = lo
+        total = 0.0
+        for i in range(n - bbp, n):
+            x = c[i]
+            total += x
+            lo = min(lo, x)
+            hi = max(hi, x)
+        bb_mid = total / bbp
+        if hi == lo:
+            bb_std = 0.0
+        elif bbp > 1:
+            m2 = 0.0
+            for i in range(n - bbp, n):
+                m2 += (c[i] - bb_mid) ** 2
+            bb_std = np.sqrt(m2 / (bbp - 1))
+
+    # 4) ATR（首根无前收盘，TR 取 high-low）
+    atr = np.nan
+    if n >= atrn > 0:
+        total = 0.0
+        for i in range(n - atrn, n):
+            tr = h[i] - l[i]
+            if i > 0:
+                tr = max(tr, abs(h[i] - c[i - 1]), abs(l[i] - c[i - 1]))
+            total += tr
+        atr = total / atrn
+
+    # 5) 成交量 20 周期均值
+    avg_volume = np.nan
+    if n >= 20:
+        total = 0.0
+        for i in range(n - 20, n):
+            total += v[i]
+        avg_volume = total / 20
+
+    return (e_fast, p_fast, e_slow, p_slow, rsi, rsi_prev, hist, p_hist,
+            bb_mid + bb_k * bb_std, bb_mid - bb_k * bb_std, bb_mid, atr, avg_volume)
@@ -14,13 +14,18 @@ Author: AI Trader Team
 Date: 2026-01-10
 """
 
+import math
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+from dataclasses import dataclass, field
 
+from src.backtest.portfolio import Side
+from src.strategies._indicator_kernel import compute as compute_indicators, rsi_value, seed_state
 
-@dataclass
+
+@dataclass(slots=True)
 class StrategyConfig:
     """策略配置"""
     # RSI 参数
@@ -51,78 +56,322 @@ class StrategyConfig:
 
 
 def calculate_indicators(df: pd.DataFrame, config: StrategyConfig) -> Dict:
-    """计算技术指标"""
-    close = df['close'].astype(float)
-    high = df['high'].astype(float)
-    low = df['low'].astype(float)
-    volume = df['volume'].astype(float)
-    
-    indicators = {}
-    
-    # EMA
-    ema_fast = close.ewm(span=config.ema_fast, adjust=False).mean()
-    ema_slow = close.ewm(span=config.ema_slow, adjust=False).mean()
-    indicators['ema_fast'] = ema_fast.iloc[-1]
-    indicators['ema_slow'] = ema_slow.iloc[-1]
-    indicators['ema_fast_prev'] = ema_fast.iloc[-2]
-    indicators['ema_slow_prev'] = ema_slow.iloc[-2]
-    
-    # EMA趋势
-    indicators['is_uptrend'] = indicators['ema_fast'] > indicators['ema_slow']
-    indicators['golden_cross'] = (indicators['ema_fast'] > indicators['ema_slow'] and 
-                                   indicators['ema_fast_prev'] <= indicators['ema_slow_prev'])
-    indicators['death_cross'] = (indicators['ema_fast'] < indicators['ema_slow'] and 
-                                  indicators['ema_fast_prev'] >= indicators['ema_slow_prev'])
-    
-    # RSI
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0).rolling(window=config.rsi_period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=config.rsi_period).mean()
-    rs = gain / loss.replace(0, 1e-10)
-    rsi = 100 - (100 / (1 + rs))
-    indicators['rsi'] = rsi.iloc[-1]
-    indicators['rsi_prev'] = rsi.iloc[-2]
-    
-    # MACD
-    ema_12 = close.ewm(span=12, adjust=False).mean()
-    ema_26 = close.ewm(span=26, adjust=False).mean()
-    macd_line = ema_12 - ema_26
-    signal_line = macd_line.ewm(span=9, adjust=False).mean()
-    macd_hist = macd_line - signal_line
-    indicators['macd_hist'] = macd_hist.iloc[-1]
-    indicators['macd_hist_prev'] = macd_hist.iloc[-2]
-    indicators['macd_momentum'] = indicators['macd_hist'] > indicators['macd_hist_prev']
-    indicators['macd_positive'] = indicators['macd_hist'] > 0
-    
-    # 布林带
-    bb_mid = close.rolling(window=config.bb_period).mean()
-    bb_std = close.rolling(window=config.bb_period).std()
-    bb_upper = bb_mid + config.bb_std * bb_std
-    bb_lower = bb_mid - config.bb_std * bb_std
-    indicators['bb_upper'] = bb_upper.iloc[-1]
-    indicators['bb_lower'] = bb_lower.iloc[-1]
-    indicators['bb_mid'] = bb_mid.iloc[-1]
-    indicators['bb_position'] = (close.iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
-    
-    # ATR
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=config.atr_period).mean()
-    indicators['atr'] = atr.iloc[-1]
-    indicators['atr_pct'] = (atr.iloc[-1] / close.iloc[-1]) * 100
+    """计算技术指标（尾部窗口的 numpy 数组交给编译内核一次算完）"""
+    # 窗口指标只需最后几根K线；EMA 递推取最慢周期的 10 倍，起点影响 < 1e-8
+    tail = max(50, 10 * max(config.ema_slow, 26), config.bb_period + 2,
+               config.atr_period + 2, config.rsi_period + 2, 22)
+    close = df['close'].to_numpy(dtype=np.float64, copy=False)[-tail:]
+    high = df['high'].to_numpy(dtype=np.float64, copy=False)[-tail:]
+    low = df['low'].to_numpy(dtype=np.float64, copy=False)[-tail:]
+    volume = df['volume'].to_numpy(dtype=np.float64, copy=False)[-tail:]
     
-    # 成交量
-    avg_volume = volume.rolling(window=20).mean().iloc[-1]
-    current_volume = volume.iloc[-1]
-    indicators['rvol'] = current_volume / avg_volume if avg_volume > 0 else 1.0
+    (ema_fast, ema_fast_prev, ema_slow, ema_slow_prev, rsi, rsi_prev,
+     macd_hist, macd_hist_prev, bb_upper, bb_lower, bb_mid, atr, avg_volume) = compute_indicators(
+        close, high, low, volume,
+        config.rsi_period, config.ema_fast, config.ema_slow,
+        config.bb_period, config.atr_period, float(config.bb_std),
+    )
+    price = float(close[-1])
+    bb_range = bb_upper - bb_lower
+    
+    return {
+        # EMA
+        'ema_fast': ema_fast,
+        'ema_slow': ema_slow,
+        'ema_fast_prev': ema_fast_prev,
+        'ema_slow_prev': ema_slow_prev,
+        
+        # EMA趋势
+        'is_uptrend': ema_fast > ema_slow,
+        'golden_cross': ema_fast > ema_slow and ema_fast_prev <= ema_slow_prev,
+        'death_cross': ema_fast < ema_slow and ema_fast_prev >= ema_slow_prev,
+        
+        # RSI
+        'rsi': rsi,
+        'rsi_prev': rsi_prev,
+        
+        # MACD
+        'macd_hist': macd_hist,
+        'macd_hist_prev': macd_hist_prev,
+        'macd_momentum': macd_hist > macd_hist_prev,
+        'macd_positive': macd_hist > 0,
+        
+        # 布林带
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'bb_mid': bb_mid,
+        'bb_position': (price - bb_lower) / bb_range if bb_range else math.nan,
+        
+        # ATR
+        'atr': atr,
+        'atr_pct': (atr / price) * 100,
+        
+        # 成交量
+        'rvol': float(volume[-1]) / avg_volume if avg_volume > 0 else 1.0,
+        
+        # 价格
+        'price': price,
+        'price_prev': float(close[-2]),
+    }
+
+
+class _RollingWindow:
+    """定长滑动窗口的均值/标准差 (增删式 Welford，O(1) 更新)"""
+    __slots__ = ('values', 'mean', 'm2', 'run')
+    
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run = 0  # 末尾连续相同值的个数
+    
+    def push(self, x: float):
+        values = self.values
+        self.run = self.run + 1 if values and values[-1] == x else 1
+        if len(values) == values.maxlen:
+            old = values[0]
+            values.append(x)
+            old_mean = self.mean
+            delta = x - old
+            self.mean += delta / len(values)
+            self.m2 += delta * (x - self.mean + old - old_mean)
+        else:
+            values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(values)
+            self.m2 += delta * (x - self.mean)
+        if self.run >= len(values):
+            # 窗口内全部相同: 与 pandas 一样精确给出均值与零方差，并清掉增删残差
+            self.mean = x
+            self.m2 = 0.0
+    
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.values.maxlen
+    
+    def avg(self) -> float:
+        """窗口均值（未填满时为 NaN，与 rolling().mean() 一致）"""
+        return self.mean if self.full else math.nan
+    
+    def std(self) -> float:
+        """窗口样本标准差 (ddof=1)"""
+        n = len(self.values)
+        if not self.full or n < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (n - 1))
+
+
+@dataclass
+class IndicatorState:
+    """
+    指标增量状态
+    
+    每根新K线 O(1) 更新 EMA / Wilder RSI / MACD / 布林带 / ATR / 成交量均值，
+    输出与 calculate_indicators 相同键的指标字典，避免每个周期对整个窗口重算。
+    """
+    config: StrategyConfig
+    last_ts: Any = None
+    count: int = 0
+    
+    # 递推量
+    last_close: float = math.nan
+    prev_close: float = math.nan
+    ema_fast: float = math.nan
+    ema_slow: float = math.nan
+    ema_12: float = math.nan
+    ema_26: float = math.nan
+    macd_signal: float = math.nan
+    
+    # Wilder RSI: 前 rsi_period 个涨跌幅累加求均值，之后递推平滑
+    avg_gain: float = 0.0
+    avg_loss: float = 0.0
+    rsi_count: int = 0
+    
+    # 上一根K线的指标值 (ema_fast, ema_slow, rsi, macd_hist)
+    prev: tuple = (math.nan, math.nan, math.nan, math.nan)
+    
+    # 滑动窗口
+    closes: _RollingWindow = field(init=False)
+    trs: _RollingWindow = field(init=False)
+    volumes: _RollingWindow = field(init=False)
+    last_volume: float = math.nan
     
-    # 价格
-    indicators['price'] = close.iloc[-1]
-    indicators['price_prev'] = close.iloc[-2]
+    def __post_init__(self):
+        cfg = self.config
+        self.closes = _RollingWindow(cfg.bb_period)
+        self.trs = _RollingWindow(cfg.atr_period)
+        self.volumes = _RollingWindow(20)
     
-    return indicators
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, config: StrategyConfig) -> 'IndicatorState':
+        """
+        用整个K线窗口初始化状态
+        
+        EMA / MACD / RSI 递推交给编译内核一次跑完，只把最后几根K线逐根喂入，
+        用来填满滑动窗口和上一根指标值
+        """
+        state = cls(config)
+        head = len(df) - max(config.bb_period, config.atr_period, 20)
+        if head > 0:
+            close = df['close'].to_numpy(dtype=np.float64)[:head]
+            (state.ema_fast, state.ema_slow, state.ema_12, state.ema_26, state.macd_signal,
+             state.avg_gain, state.avg_loss, state.rsi_count) = seed_state(
+                close, config.rsi_period, config.ema_fast, config.ema_slow)
+            state.last_close = float(close[-1])
+            state.count = head
+            df = df.iloc[head:]
+        state._feed(df)
+        state.last_ts = df.index[-1]
+        return state
+    
+    def sync(self, df: pd.DataFrame) -> bool:
+        """
+        把状态推进到 df 的最后一根K线
+        
+        Returns:
+            False 表示无法与 df 衔接（窗口跳跃、重放或数据不一致），需要重建
+        """
+        try:
+            pos = df.index.get_loc(self.last_ts)
+        except (KeyError, TypeError):
+            return False
+        if not isinstance(pos, int) or float(df['close'].iat[pos]) != self.last_close:
+            return False
+        if pos + 1 < len(df):
+            self._feed(df.iloc[pos + 1:])
+            self.last_ts = df.index[-1]
+        return True
+    
+    def _feed(self, df: pd.DataFrame):
+        # 转为 Python float，逐根递推时避免 numpy 标量运算开销
+        columns = (
+            df[col].to_numpy(dtype=np.float64, copy=False).tolist()
+            for col in ('high', 'low', 'close', 'volume')
+        )
+        update = self.update
+        for high, low, close, volume in zip(*columns):
+            update(high, low, close, volume)
+    
+    def update(self, high: float, low: float, close: float, volume: float):
+        """追加一根已完成K线"""
+        cfg = self.config
+        self.prev = (self.ema_fast, self.ema_slow, self._rsi(), self.ema_12 - self.ema_26 - self.macd_signal)
+        
+        if self.count == 0:
+            self.ema_fast = self.ema_slow = self.ema_12 = self.ema_26 = close
+            self.macd_signal = 0.0
+            # 首根没有前收盘: 不计涨跌幅，TR 只有 high-low
+            tr = high - low
+        else:
+            self.ema_fast += 2.0 / (cfg.ema_fast + 1) * (close - self.ema_fast)
+            self.ema_slow += 2.0 / (cfg.ema_slow + 1) * (close - self.ema_slow)
+            self.ema_12 += 2.0 / 13 * (close - self.ema_12)
+            self.ema_26 += 2.0 / 27 * (close - self.ema_26)
+            self.macd_signal += 0.2 * (self.ema_12 - self.ema_26 - self.macd_signal)
+            
+            delta = close - self.last_close
+            self._push_rsi(delta if delta > 0 else 0.0, -delta if delta < 0 else 0.0)
+            tr = max(high - low, abs(high - self.last_close), abs(low - self.last_close))
+        
+        self.trs.push(tr)
+        self.closes.push(close)
+        self.volumes.push(volume)
+        self.prev_close = self.last_close
+        self.last_close = close
+        self.last_volume = volume
+        self.count += 1
+    
+    def _push_rsi(self, gain: float, loss: float):
+        n = self.config.rsi_period
+        if self.rsi_count < n:
+            self.avg_gain += gain
+            self.avg_loss += loss
+            self.rsi_count += 1
+            if self.rsi_count == n:
+                self.avg_gain /= n
+                self.avg_loss /= n
+        else:
+            self.avg_gain = (self.avg_gain * (n - 1) + gain) / n
+            self.avg_loss = (self.avg_loss * (n - 1) + loss) / n
+    
+    def _rsi(self) -> float:
+        if self.rsi_count < self.config.rsi_period:
+            return math.nan
+        return rsi_value(self.avg_gain, self.avg_loss)
+    
+    def indicators(self) -> Dict:
+        """当前指标字典（键与 calculate_indicators 一致）"""
+        cfg = self.config
+        ema_fast_prev, ema_slow_prev, rsi_prev, macd_hist_prev = self.prev
+        ema_fast = self.ema_fast
+        ema_slow = self.ema_slow
+        macd_hist = self.ema_12 - self.ema_26 - self.macd_signal
+        
+        bb_mid = self.closes.avg()
+        bb_width = cfg.bb_std * self.closes.std()
+        bb_upper = bb_mid + bb_width
+        bb_lower = bb_mid - bb_width
+        bb_range = bb_upper - bb_lower
+        
+        atr = self.trs.avg()
+        price = self.last_close
+        avg_volume = self.volumes.avg()
+        
+        return {
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'ema_fast_prev': ema_fast_prev,
+            'ema_slow_prev': ema_slow_prev,
+            'is_uptrend': ema_fast > ema_slow,
+            'golden_cross': ema_fast > ema_slow and ema_fast_prev <= ema_slow_prev,
+            'death_cross': ema_fast < ema_slow and ema_fast_prev >= ema_slow_prev,
+            'rsi': self._rsi(),
+            'rsi_prev': rsi_prev,
+            'macd_hist': macd_hist,
+            'macd_hist_prev': macd_hist_prev,
+            'macd_momentum': macd_hist > macd_hist_prev,
+            'macd_positive': macd_hist > 0,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'bb_mid': bb_mid,
+            'bb_position': (price - bb_lower) / bb_range if bb_range else math.nan,
+            'atr': atr,
+            'atr_pct': (atr / price) * 100,
+            'rvol': self.last_volume / avg_volume if avg_volume > 0 else 1.0,
+            'price': price,
+            'price_prev': self.prev_close,
+        }
+
+
+# 未传入配置时共用的默认配置（只读）
+_DEFAULT_CFG = StrategyConfig()
+
+# 成交量加权后的置信度上限
+_MAX_CONFIDENCE = 95
+
+
+# 指标增量状态缓存: (symbol, timeframe) -> IndicatorState，LRU 淘汰防止多币种回测泄漏
+_STATE_CACHE: "OrderedDict[Tuple[str, str], IndicatorState]" = OrderedDict()
+_STATE_CACHE_SIZE = 10
+
+
+def _indicator_state(
+    symbol: str,
+    df: pd.DataFrame,
+    config: StrategyConfig,
+    timeframe: str = '5m'
+) -> IndicatorState:
+    """获取与 df 同步的指标状态（首次或无法衔接时用整个窗口重建）"""
+    key = (symbol, timeframe)
+    state = _STATE_CACHE.get(key)
+    if state is None or state.config != config or not state.sync(df):
+        state = IndicatorState.from_frame(df, config)
+        _STATE_CACHE[key] = state
+        if len(_STATE_CACHE) > _STATE_CACHE_SIZE:
+            _STATE_CACHE.popitem(last=False)
+    else:
+        _STATE_CACHE.move_to_end(key)
+    return state
 
 
 def optimized_strategy_v2(
@@ -142,19 +391,20 @@ def optimized_strategy_v2(
     4. 更灵活的入场条件
     """
     if strategy_config is None:
-        strategy_config = StrategyConfig()
+        strategy_config = _DEFAULT_CFG
     
-    # 获取数据
-    df = snapshot.stable_5m.copy()
+    # 获取数据（只读，不复制）
+    df = snapshot.stable_5m
     
     if len(df) < 50:
         return {'action': 'hold', 'confidence': 0.0, 'reason': 'insufficient_data'}
     
-    # 计算指标
-    ind = calculate_indicators(df, strategy_config)
-    
     # 持仓状态
     symbol = config.symbol
+    
+    # 计算指标（增量更新，只处理上个周期之后的新K线）
+    ind = _indicator_state(symbol, df, strategy_config).indicators()
+    
     has_position = symbol in portfolio.positions
     
     # 动态止损止盈参数
@@ -169,85 +419,90 @@ def optimized_strategy_v2(
     # ========== 入场信号 ==========
     
     if not has_position:
+        # 指标与阈值取到局部变量，信号按强度保留最大值（同强度取先出现者）
+        rsi = ind['rsi']
+        rsi_prev = ind['rsi_prev']
+        bb_pos = ind['bb_position']
+        is_uptrend = ind['is_uptrend']
+        macd_positive = ind['macd_positive']
+        rvol_boost = ind['rvol'] > strategy_config.rvol_threshold
+        
         # 🟢 做多信号
-        long_signals = []
+        best_name = None
+        best_conf = 0
         
         # 信号1: RSI超卖 + 上升趋势
-        if ind['rsi'] < strategy_config.rsi_oversold and ind['is_uptrend']:
-            long_signals.append(('rsi_oversold_uptrend', 75))
+        if rsi < strategy_config.rsi_oversold and is_uptrend:
+            best_name, best_conf = 'rsi_oversold_uptrend', 75
         
         # 信号2: RSI极度超卖 (任何趋势)
-        if ind['rsi'] < strategy_config.rsi_extreme_oversold:
-            long_signals.append(('rsi_extreme_oversold', 85))
+        if best_conf < 85 and rsi < strategy_config.rsi_extreme_oversold:
+            best_name, best_conf = 'rsi_extreme_oversold', 85
         
         # 信号3: 金叉 + MACD确认
-        if ind['golden_cross'] and ind['macd_positive']:
-            long_signals.append(('golden_cross_macd+', 80))
+        if best_conf < 80 and ind['golden_cross'] and macd_positive:
+            best_name, best_conf = 'golden_cross_macd+', 80
         
         # 信号4: 布林带下轨突破 + RSI不超买
-        if ind['bb_position'] < 0.1 and ind['rsi'] < 50:
-            long_signals.append(('bb_lower_breakout', 70))
+        if best_conf < 70 and bb_pos < 0.1 and rsi < 50:
+            best_name, best_conf = 'bb_lower_breakout', 70
         
         # 信号5: RSI背离反转
-        if ind['rsi'] < 40 and ind['rsi'] > ind['rsi_prev'] and ind['macd_momentum']:
-            long_signals.append(('rsi_reversal', 65))
+        if best_conf < 65 and rsi < 40 and rsi > rsi_prev and ind['macd_momentum']:
+            best_name, best_conf = 'rsi_reversal', 65
         
         # 选择最强信号
-        if long_signals:
-            best_signal = max(long_signals, key=lambda x: x[1])
-            confidence = best_signal[1]
+        if best_name is not None:
+            confidence = best_conf
             
-            # 成交量加权
-            if ind['rvol'] > strategy_config.rvol_threshold:
-                confidence = min(confidence + 5, 95)
+            # 成交量加权（置信度封顶 _MAX_CONFIDENCE）
+            if rvol_boost:
+                boosted = confidence + 5
+                confidence = boosted if boosted < _MAX_CONFIDENCE else _MAX_CONFIDENCE
             
             return {
                 'action': 'long',
                 'confidence': confidence,
-                'reason': f'long_{best_signal[0]}_rsi{ind["rsi"]:.0f}',
+                'reason': f'long_{best_name}_rsi{rsi:.0f}',
                 'trade_params': trade_params
             }
         
         # 🔴 做空信号 (如果启用)
         if strategy_config.enable_short:
-            short_signals = []
-            
             # 信号1: RSI超买 + 下降趋势
-            if ind['rsi'] > strategy_config.rsi_overbought and not ind['is_uptrend']:
-                short_signals.append(('rsi_overbought_downtrend', 75))
+            if rsi > strategy_config.rsi_overbought and not is_uptrend:
+                best_name, best_conf = 'rsi_overbought_downtrend', 75
             
             # 信号2: RSI极度超买
-            if ind['rsi'] > strategy_config.rsi_extreme_overbought:
-                short_signals.append(('rsi_extreme_overbought', 80))
+            if best_conf < 80 and rsi > strategy_config.rsi_extreme_overbought:
+                best_name, best_conf = 'rsi_extreme_overbought', 80
             
             # 信号3: 死叉 + MACD确认
-            if ind['death_cross'] and not ind['macd_positive']:
-                short_signals.append(('death_cross_macd-', 80))
+            if best_conf < 80 and ind['death_cross'] and not macd_positive:
+                best_name, best_conf = 'death_cross_macd-', 80
             
             # 信号4: 布林带上轨突破 + RSI超买
-            if ind['bb_position'] > 0.95 and ind['rsi'] > 60:
-                short_signals.append(('bb_upper_breakout', 70))
+            if best_conf < 70 and bb_pos > 0.95 and rsi > 60:
+                best_name, best_conf = 'bb_upper_breakout', 70
             
             # 选择最强信号
-            if short_signals:
-                best_signal = max(short_signals, key=lambda x: x[1])
-                confidence = best_signal[1]
+            if best_name is not None:
+                confidence = best_conf
                 
-                if ind['rvol'] > strategy_config.rvol_threshold:
-                    confidence = min(confidence + 5, 95)
+                if rvol_boost:
+                    boosted = confidence + 5
+                    confidence = boosted if boosted < _MAX_CONFIDENCE else _MAX_CONFIDENCE
                 
                 return {
                     'action': 'short',
                     'confidence': confidence,
-                    'reason': f'short_{best_signal[0]}_rsi{ind["rsi"]:.0f}',
+                    'reason': f'short_{best_name}_rsi{rsi:.0f}',
                     'trade_params': trade_params
                 }
     
     # ========== 持仓管理 ==========
     
     if has_position:
-        from src.backtest.portfolio import Side
-        
         position = portfolio.positions[symbol]
         current_side = position.side
         entry_price = position.entry_price
@@ -9,6 +9,7 @@ Author: AI Trader Team
 Date: 2026-01-23
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict
 
@@ -44,20 +45,17 @@ class ATRCalculator:
         if len(df) < self.period:
             return 0.0
         
-        high = df['high']
-        low = df['low']
-        close = df['close']
+        # Only the last `period` bars (plus one previous close) are needed
+        tail = df.iloc[-(self.period + 1):]
+        high = tail['high'].to_numpy(dtype=float)
+        low = tail['low'].to_numpy(dtype=float)
+        prev_close = tail['close'].shift().to_numpy(dtype=float)
         
-        # True Range components
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        
-        # True Range = max of three components
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        # True Range = max of three components (fmax skips the missing first prev close)
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
         
         # ATR = moving average of TR
-        atr = tr.rolling(self.period).mean().iloc[-1]
+        atr = tr[-self.period:].mean()
         
         return atr
     
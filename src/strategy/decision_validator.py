@@ -3,10 +3,14 @@
 验证 LLM 决策的合法性和安全性
 """
 
+import re
 from typing import Dict, List, Tuple, Optional
 from src.utils.logger import log
 from src.utils.action_protocol import normalize_action, VALID_ACTIONS, OPEN_ACTIONS
 
+# 带千位分隔符的数字，如 "86,000" / "1,234.5"
+_THOUSANDS_RE = re.compile(r'^\d{1,3}(?:,\d{3})+(?:\.\d+)?$')
+
 
 class DecisionValidator:
     """
@@ -54,13 +58,14 @@ class DecisionValidator:
         if errors:
             return False, errors
         
-        # 2. action 合法性检查（统一动作协议）
-        decision['action'] = normalize_action(
+        # 2. action 合法性检查（统一动作协议，只规范化一次并传给后续检查）
+        action = normalize_action(
             decision.get('action'),
             position_side=decision.get('position_side')
         )
-        if decision['action'] not in VALID_ACTIONS:
-            errors.append(f"无效的 action: {decision['action']}")
+        decision['action'] = action
+        if action not in VALID_ACTIONS:
+            errors.append(f"无效的 action: {action}")
         
         # 3. confidence 检查（如果存在）
         if 'confidence' in decision:
@@ -73,7 +78,7 @@ class DecisionValidator:
         errors.extend(format_errors)
         
         # 5. 开仓操作的额外检查
-        if decision['action'] in OPEN_ACTIONS:
+        if action in OPEN_ACTIONS:
             # 5.1 开仓必填字段
             open_required = ['leverage', 'position_size_usd', 'stop_loss', 'take_profit']
             for field in open_required:
@@ -106,8 +111,7 @@ class DecisionValidator:
                         errors.append(f"{field} 必须是数字: {value}")
             
             # 5.5 止损方向检查
-            if not self.validate_stop_loss_direction(decision):
-                action = decision['action']
+            if not self.validate_stop_loss_direction(decision, action):
                 entry = decision.get('entry_price', decision.get('current_price', 0))
                 stop_loss = decision.get('stop_loss', 0)
                 if action == 'open_long':
@@ -116,12 +120,25 @@ class DecisionValidator:
                     errors.append(f"做空止损方向错误: stop_loss ({stop_loss}) 必须 > entry_price ({entry})")
             
             # 5.6 风险回报比检查
-            if not self.validate_risk_reward_ratio(decision):
-                ratio = self.calculate_risk_reward_ratio(decision)
+            ratio = self.calculate_risk_reward_ratio(decision, action)
+            if ratio is not None and ratio < self.min_risk_reward_ratio:
                 errors.append(f"风险回报比不足: {ratio:.2f} < {self.min_risk_reward_ratio}")
         
         return len(errors) == 0, errors
     
+    def validate_many(self, decisions: List[Dict]) -> List[Tuple[bool, List[str]]]:
+        """
+        批量验证决策（如回测中同一周期多个币种的决策）
+        
+        Args:
+            decisions: 决策字典列表
+            
+        Returns:
+            与输入顺序一致的 (is_valid, errors) 列表
+        """
+        validate = self.validate
+        return [validate(decision) for decision in decisions]
+    
     def _validate_format(self, decision: Dict) -> List[str]:
         """
         验证数值格式
@@ -144,14 +161,13 @@ class DecisionValidator:
                 if '~' in value:
                     errors.append(f"字段 {key} 包含禁止的范围符号 '~': {value}")
                 
-                # 检查千位分隔符（在数字上下文中）
-                import re
-                if re.match(r'^\d{1,3}(,\d{3})+(\.\d+)?$', value):
+                # 检查千位分隔符（在数字上下文中；含 '~' 的值不可能匹配）
+                elif ',' in value and _THOUSANDS_RE.match(value):
                     errors.append(f"字段 {key} 包含禁止的千位分隔符 ',': {value}")
         
         return errors
     
-    def validate_stop_loss_direction(self, decision: Dict) -> bool:
+    def validate_stop_loss_direction(self, decision: Dict, action: Optional[str] = None) -> bool:
         """
         验证止损方向
         
@@ -161,14 +177,16 @@ class DecisionValidator:
         
         Args:
             decision: 决策字典
+            action: 已规范化的 action（validate 传入，省略时取 decision['action']）
             
         Returns:
             True if valid, False otherwise
         """
-        action = normalize_action(
-            decision.get('action'),
-            position_side=decision.get('position_side')
-        )
+        if action is None:
+            # validate() 已原地规范化，单独调用时才需要再规范化
+            action = decision.get('action')
+            if action not in VALID_ACTIONS:
+                action = normalize_action(action, position_side=decision.get('position_side'))
         
         # 只检查开仓操作
         if action not in OPEN_ACTIONS:
@@ -190,7 +208,7 @@ class DecisionValidator:
         
         return True
     
-    def validate_risk_reward_ratio(self, decision: Dict) -> bool:
+    def validate_risk_reward_ratio(self, decision: Dict, action: Optional[str] = None) -> bool:
         """
         验证风险回报比
         
@@ -198,31 +216,34 @@ class DecisionValidator:
         
         Args:
             decision: 决策字典
+            action: 已规范化的 action（可选）
             
         Returns:
             True if valid, False otherwise
         """
-        ratio = self.calculate_risk_reward_ratio(decision)
+        ratio = self.calculate_risk_reward_ratio(decision, action)
         
         if ratio is None:
             return True  # 无法计算时不拦截
         
         return ratio >= self.min_risk_reward_ratio
     
-    def calculate_risk_reward_ratio(self, decision: Dict) -> Optional[float]:
+    def calculate_risk_reward_ratio(self, decision: Dict, action: Optional[str] = None) -> Optional[float]:
         """
         计算风险回报比
         
         Args:
             decision: 决策字典
+            action: 已规范化的 action（可选，省略时取 decision['action']）
             
         Returns:
             风险回报比，如果无法计算返回 None
         """
-        action = normalize_action(
-            decision.get('action'),
-            position_side=decision.get('position_side')
-        )
+        if action is None:
+            # validate() 已原地规范化，单独调用时才需要再规范化
+            action = decision.get('action')
+            if action not in VALID_ACTIONS:
+                action = normalize_action(action, position_side=decision.get('position_side'))
         
         # 只计算开仓操作
         if action not in OPEN_ACTIONS:
@@ -237,18 +258,18 @@ class DecisionValidator:
         if None in [entry_price, stop_loss, take_profit]:
             return None
         
-        # 计算风险和收益
+        # 计算风险和收益（方向已知，直接相减；止盈方向错误时收益为负）
         if action == 'open_long':
-            risk = abs(entry_price - stop_loss)
-            reward = abs(take_profit - entry_price)
+            risk = entry_price - stop_loss
+            reward = take_profit - entry_price
         elif action == 'open_short':
-            risk = abs(stop_loss - entry_price)
-            reward = abs(entry_price - take_profit)
+            risk = stop_loss - entry_price
+            reward = entry_price - take_profit
         else:
             return None
         
-        # 避免除零
-        if risk == 0:
+        # 避免除零；止损方向错误由 validate_stop_loss_direction 报告
+        if risk <= 0:
             return None
         
         return reward / risk
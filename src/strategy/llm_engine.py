@@ -182,7 +182,7 @@ class StrategyEngine:
         # 🆕 保存Bull/Bear日志 (if they were generated here or passed in)
         try:
             from src.server.state import global_state
-            if hasattr(global_state, 'saver') and hasattr(global_state, 'current_cycle_id'):
+            if global_state.saver is not None:
                 global_state.saver.save_bull_bear_perspectives(
                     bull=bull_perspective,
                     bear=bear_perspective,
@@ -20,10 +20,84 @@ LLM 输出解析器
 
 import re
 import json
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Pattern, Tuple
 from src.utils.logger import log
+from src.utils.json_utils import fast_json_loads
 from src.utils.action_protocol import normalize_action
 
+try:
+    import pyjson5
+    HAS_PYJSON5 = True
+except ImportError:
+    HAS_PYJSON5 = False
+
+
+def _compile_tag_pattern(tag: str) -> Pattern:
+    """编译某个 XML 标签的提取正则：```json / ``` 代码块优先，否则取标签内全部内容"""
+    return re.compile(
+        rf'<{tag}>\s*(?:```(?:json)?\s*(?P<fenced>.*?)\s*```|(?P<plain>.*?))\s*</{tag}>',
+        re.DOTALL | re.IGNORECASE
+    )
+
+
+# 预编译正则（parse() 每次调用都会用到，避免 re 模块缓存查找）
+_TAG_RE = {tag: _compile_tag_pattern(tag) for tag in ('reasoning', 'decision', 'final_vote')}
+_MD_PREFIX_JSON = re.compile(r'^```json\s*')
+_MD_PREFIX = re.compile(r'^```\s*')
+_MD_SUFFIX = re.compile(r'\s*```$')
+_TRAIL_COMMA_OBJ = re.compile(r',\s*}')
+_TRAIL_COMMA_ARR = re.compile(r',\s*\]')
+# 数值修正（一次扫描）：范围符号 "85000~86000" / 字符串中的千位分隔符 "84,710" / 数值中的千位分隔符 : 84,710,
+_NUMBER_FIX_RE = re.compile(
+    r'(?P<range_first>\d+\.?\d*)\s*~\s*\d+\.?\d*'
+    r'|"(?P<qnum>\d{1,3}(?:,\d{3})+(?:\.\d+)?)"'
+    r'|:\s*(?P<jnum>\d{1,3}(?:,\d{3})+(?:\.\d+)?)\s*(?P<jend>[,}\]])'
+)
+_ARRAY_PREFIX_RE = re.compile(r'\s*\[\{')
+_VALIDATE_BAD_RE = re.compile(r'~|\d{1,3},\d{3}')
+_DIGIT_COMMA_RE = re.compile(r'\d,\d')
+# 括号计数时需要关注的字符（引号 + 对应括号）
+_BRACKET_DELIMS = {
+    '[]': re.compile(r'["\[\]]'),
+    '{}': re.compile(r'["{}]'),
+}
+
+# 全角符号 -> 半角符号
+_FULLWIDTH_TABLE = str.maketrans({
+    '［': '[',
+    '］': ']',
+    '｛': '{',
+    '｝': '}',
+    '：': ':',
+    '，': ',',
+})
+
+# 解析失败时的安全回退决策模板
+_FALLBACK_TEMPLATE = {
+    'symbol': 'BTCUSDT',
+    'action': 'wait',
+    'confidence': 0,
+    'reasoning': 'Parse error, fallback to safe wait decision'
+}
+
+
+def _fix_number(match: 're.Match') -> str:
+    """_NUMBER_FIX_RE 的替换函数：按命中的分支修正数值"""
+    first = match.group('range_first')
+    if first is not None:
+        return first
+    qnum = match.group('qnum')
+    if qnum is not None:
+        return '"' + qnum.replace(',', '') + '"'
+    return ': ' + match.group('jnum').replace(',', '') + match.group('jend')
+
+
+def _normalize_list(data):
+    """解析结果为非空数组时取第一个元素"""
+    if isinstance(data, list) and len(data) > 0:
+        return data[0]
+    return data
+
 
 class LLMOutputParser:
     """
@@ -47,7 +121,7 @@ class LLMOutputParser:
     特性：
     1. 优先从 XML 标签提取
     2. 支持 ```json 代码块
-    3. 自动修复常见字符错误（中文引号、冒号、范围符号等）
+    3. 自动修复常见字符错误（全角括号、冒号、范围符号等）
     4. 解析失败时进入安全回退模式（返回 wait 决策）
     """
     
@@ -69,6 +143,17 @@ class LLMOutputParser:
             }
         """
         try:
+            # 0. 快速路径：整个响应就是 JSON 数组 [{...}]（没有 XML 标签和推理过程）
+            stripped = llm_response.strip()
+            if stripped.startswith('[{') and self._extract_balanced_json(stripped, '[', ']') == stripped:
+                decision = self._parse_json_with_fallback(stripped, quiet=True)
+                if isinstance(decision, dict) and 'action' in decision:
+                    return {
+                        'reasoning': '',
+                        'decision': decision,
+                        'raw_response': llm_response
+                    }
+            
             # 1. 提取推理过程
             reasoning = self._extract_tag_content(llm_response, 'reasoning')
             
@@ -79,16 +164,19 @@ class LLMOutputParser:
                 if decision_json:
                     break
             
-            # 3. 如果标签内没找到，尝试在整个响应中搜索 JSON
-            if not decision_json:
-                decision_json = self._extract_json_from_text(llm_response)
-            
-            # 4. 解析 JSON（带容错和安全回退）
+            # 3. 解析 JSON（带容错和安全回退）
             if decision_json:
                 decision = self._parse_json_with_fallback(decision_json)
             else:
-                log.warning("未找到决策 JSON，进入安全回退模式")
-                decision = self._get_fallback_decision()
+                # 4. 标签内没找到时在整个响应中搜索 JSON，逐个候选解析直到得到决策对象
+                #    （对象内部的数组如 "levels": [1, 2] 也会作为候选出现，需跳过）
+                for candidate in self._iter_json_candidates(llm_response):
+                    decision = self._parse_json_with_fallback(candidate, quiet=True)
+                    if isinstance(decision, dict) and 'action' in decision:
+                        break
+                else:
+                    log.warning("未找到决策 JSON，进入安全回退模式")
+                    decision = self._get_fallback_decision()
             
             # 5. 确保决策有效，否则使用回退
             if not decision or 'action' not in decision:
@@ -121,60 +209,55 @@ class LLMOutputParser:
         Returns:
             标签内容，如果未找到返回 None
         """
-        # 支持多种标签格式
-        patterns = [
-            rf'<{tag}>\s*```json\s*(.*?)\s*```\s*</{tag}>',  # 包含 ```json
-            rf'<{tag}>\s*```\s*(.*?)\s*```\s*</{tag}>',  # 包含 ```
-            rf'<{tag}>(.*?)</{tag}>',  # 标准格式
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-            if match:
-                content = match.group(1).strip()
-                # 如果是 JSON 标签，移除可能的 markdown 代码块标记
-                if tag in self.supported_tags:
-                    content = re.sub(r'^```json\s*', '', content)
-                    content = re.sub(r'^```\s*', '', content)
-                    content = re.sub(r'\s*```$', '', content)
-                return content
+        # 支持多种标签格式（一次扫描：代码块分支优先，其次为标准格式）
+        pattern = _TAG_RE.get(tag) or _compile_tag_pattern(tag)
+        match = pattern.search(text)
+        if match is None:
+            return None
         
-        return None
+        content = match.group('fenced')
+        if content is not None:
+            return content.strip()
+        
+        content = match.group('plain').strip()
+        # 代码块不完整（如缺少结尾 ```）时，JSON 标签移除残留的 markdown 标记
+        if tag in self.supported_tags and '```' in content:
+            content = _MD_PREFIX_JSON.sub('', content)
+            content = _MD_PREFIX.sub('', content)
+            content = _MD_SUFFIX.sub('', content)
+        return content
     
-    def _extract_json_from_text(self, text: str) -> Optional[str]:
+    def _iter_json_candidates(self, text: str) -> Iterator[str]:
         """
-        从文本中提取 JSON 对象或数组
+        依次给出文本中可能的 JSON 对象或数组
         
-        使用括号计数算法正确处理嵌套结构
+        使用括号计数算法正确处理嵌套结构；候选不做校验，由调用方解析，
+        解析失败时再从该候选之后继续寻找
         
         Args:
             text: 原始文本
             
-        Returns:
-            JSON 字符串，如果未找到返回 None
+        Yields:
+            JSON 字符串候选
         """
         # 方法1: 使用括号计数提取完整 JSON 数组 [{...}]
-        json_str = self._extract_balanced_json(text, '[', ']')
-        if json_str:
-            return json_str
-        
         # 方法2: 使用括号计数提取 JSON 对象 {...}
-        json_str = self._extract_balanced_json(text, '{', '}')
-        if json_str:
-            return json_str
-        
-        # 方法3: 回退到原有正则匹配 (简单场景)
-        arr_match = re.search(r'\[\s*\{.*?\}\s*\]', text, re.DOTALL)
-        if arr_match:
-            return arr_match.group(0)
-        
-        obj_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-        if obj_match:
-            return obj_match.group(0)
-        
-        return None
+        for open_char, close_char in (('[', ']'), ('{', '}')):
+            start = text.find(open_char)
+            while start != -1:
+                json_str = self._extract_balanced_json(text, open_char, close_char, start)
+                if json_str is None:
+                    break
+                yield json_str
+                start = text.find(open_char, start + len(json_str))
     
-    def _extract_balanced_json(self, text: str, open_char: str, close_char: str) -> Optional[str]:
+    def _extract_balanced_json(
+        self,
+        text: str,
+        open_char: str,
+        close_char: str,
+        start: int = 0
+    ) -> Optional[str]:
         """
         使用括号计数提取平衡的 JSON 结构
         
@@ -182,87 +265,101 @@ class LLMOutputParser:
             text: 原始文本
             open_char: 开始字符 ('{' 或 '[')
             close_char: 结束字符 ('}' 或 ']')
+            start: 开始搜索的位置
             
         Returns:
-            完整的 JSON 字符串，如果未找到返回 None
+            完整的 JSON 字符串（未校验），如果未找到返回 None
         """
-        start_idx = text.find(open_char)
+        start_idx = text.find(open_char, start)
         if start_idx == -1:
             return None
         
+        # 只在引号和括号之间跳转（C 层查找），不逐字符遍历
+        delims = _BRACKET_DELIMS.get(open_char + close_char) or re.compile(
+            '["' + re.escape(open_char) + re.escape(close_char) + ']'
+        )
         count = 0
-        in_string = False
-        escape_next = False
-        
-        for i, char in enumerate(text[start_idx:], start_idx):
-            # 处理字符串内部转义
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\' and in_string:
-                escape_next = True
-                continue
+        i = start_idx
+        
+        while True:
+            match = delims.search(text, i)
+            if match is None:
+                return None
+            i = match.start()
+            char = text[i]
             
-            # 处理字符串边界
-            if char == '"' and not escape_next:
-                in_string = not in_string
+            # 跳过整个字符串：下一个前面有偶数个反斜杠的引号即为字符串结尾
+            if char == '"':
+                end = text.find('"', i + 1)
+                while end != -1:
+                    k = end - 1
+                    while text[k] == '\\':
+                        k -= 1
+                    if (end - k) % 2:
+                        break
+                    end = text.find('"', end + 1)
+                if end == -1:
+                    return None
+                i = end + 1
                 continue
             
             # 只在字符串外部计数括号
-            if not in_string:
-                if char == open_char:
-                    count += 1
-                elif char == close_char:
-                    count -= 1
-                    
-                    if count == 0:
-                        # 找到完整的 JSON 结构
-                        json_str = text[start_idx:i + 1]
-                        # 验证是否可解析
-                        try:
-                            json.loads(json_str)
-                            return json_str
-                        except json.JSONDecodeError:
-                            # 继续寻找下一个可能的 JSON
-                            return None
-        
-        return None
+            if char == open_char:
+                count += 1
+            else:
+                count -= 1
+                
+                if count == 0:
+                    # 找到完整的 JSON 结构（是否可解析由调用方判断，避免重复解析）
+                    return text[start_idx:i + 1]
+            i += 1
 
     
-    def _parse_json_with_fallback(self, json_str: str) -> Dict:
+    def _parse_json_with_fallback(self, json_str: str, quiet: bool = False) -> Dict:
         """
         带容错的 JSON 解析
         
         Args:
             json_str: JSON 字符串
+            quiet: 解析失败时不记录错误（逐个尝试候选时使用）
             
         Returns:
             解析后的字典
         """
-        # 1. 预处理：修正常见格式错误
+        # 1. 快速路径：不含范围符号/千位分隔符时先直接严格解析
+        #    （解析成功说明全角符号只出现在字符串值中，无需替换）
+        strict_tried = '~' not in json_str and not _DIGIT_COMMA_RE.search(json_str)
+        if strict_tried:
+            try:
+                return _normalize_list(fast_json_loads(json_str))
+            except json.JSONDecodeError:
+                pass
+        
+        # 2. 预处理：修正常见格式错误后再解析（文本未变化时不重复解析）
         normalized = self._normalize_characters(json_str)
-        
-        # 2. 尝试直接解析
+        if not strict_tried or normalized != json_str:
+            try:
+                return _normalize_list(fast_json_loads(normalized))
+            except json.JSONDecodeError:
+                pass
+        
+        # 3. 宽松解析：pyjson5 一次处理尾部逗号等 JSON5 语法
+        if HAS_PYJSON5:
+            try:
+                return _normalize_list(pyjson5.loads(normalized))
+            except ValueError as e:
+                if not quiet:
+                    log.error(f"JSON 解析失败（即使修正后）: {e}")
+                return {}
+        
+        # 4. 未安装 pyjson5：移除尾部逗号后解析
         try:
-            data = json.loads(normalized)
-            # 如果是数组，取第一个元素
-            if isinstance(data, list) and len(data) > 0:
-                data = data[0]
-            return data
-        except json.JSONDecodeError:
-            pass
-        
-        # 3. 尝试移除尾部逗号后解析
-        try:
-            cleaned = re.sub(r',\s*}', '}', normalized)
-            cleaned = re.sub(r',\s*\]', ']', cleaned)
-            data = json.loads(cleaned)
-            if isinstance(data, list) and len(data) > 0:
-                data = data[0]
-            return data
+            cleaned = _TRAIL_COMMA_OBJ.sub('}', normalized)
+            cleaned = _TRAIL_COMMA_ARR.sub(']', cleaned)
+            return _normalize_list(fast_json_loads(cleaned))
         except json.JSONDecodeError as e:
-            log.error(f"JSON 解析失败（即使修正后）: {e}")
+            if not quiet:
+                log.error(f"JSON 解析失败（即使修正后）: {e}")
             return {}
     
     def _normalize_characters(self, text: str) -> str:
@@ -270,10 +367,9 @@ class LLMOutputParser:
         修正格式错误
         
         修正内容：
-        1. 全角字符 -> 半角字符
-        2. 中文引号 -> 英文引号
-        3. 移除范围符号 ~
-        4. 移除数字中的千位分隔符 ,
+        1. 全角括号/冒号/逗号 -> 半角字符
+        2. 移除范围符号 ~
+        3. 移除数字中的千位分隔符 ,
         
         Args:
             text: 原始文本
@@ -281,36 +377,15 @@ class LLMOutputParser:
         Returns:
             修正后的文本
         """
-        # 全角符号 -> 半角符号
-        replacements = {
-            '［': '[',
-            '］': ']',
-            '｛': '{',
-            '｝': '}',
-            '：': ':',
-            '，': ',',
-            # 中文引号 -> 英文引号
-            '"': '"',
-            '"': '"',
-            ''': "'",
-            ''': "'",
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
+        # 全角符号 -> 半角符号（单次 translate；纯 ASCII 文本不可能包含全角字符）
+        if not text.isascii():
+            text = text.translate(_FULLWIDTH_TABLE)
         
         # 移除范围符号 ~ (如 "85000~86000" -> 取第一个值 "85000")
-        text = re.sub(r'(\d+\.?\d*)\s*~\s*\d+\.?\d*', r'\1', text)
-        
         # 移除数字中的千位分隔符 (如 "84,710" -> "84710")
-        # 匹配字符串值中的带逗号数字
-        text = re.sub(r'"(\d{1,3}(?:,\d{3})+(?:\.\d+)?)"', 
-                      lambda m: '"' + m.group(1).replace(',', '') + '"', text)
-        
-        # 移除数字值（非字符串）中的千位分隔符
-        # 这个正则匹配 : 后面的带逗号数字
-        text = re.sub(r':\s*(\d{1,3}(?:,\d{3})+(?:\.\d+)?)\s*([,}\]])', 
-                      lambda m: ': ' + m.group(1).replace(',', '') + m.group(2), text)
+        # 三种修正合并为一次替换；既没有 ~ 也没有 "数字,数字" 时不会命中
+        if '~' in text or _DIGIT_COMMA_RE.search(text):
+            text = _NUMBER_FIX_RE.sub(_fix_number, text)
         
         return text
     
@@ -323,12 +398,8 @@ class LLMOutputParser:
         Returns:
             安全的 wait 决策
         """
-        return {
-            'symbol': 'BTCUSDT',
-            'action': 'wait',
-            'confidence': 0,
-            'reasoning': 'Parse error, fallback to safe wait decision'
-        }
+        # 返回副本：调用方可能修改决策字典
+        return _FALLBACK_TEMPLATE.copy()
     
     def normalize_action(self, action: str, position_side: Optional[str] = None) -> str:
         """
@@ -363,76 +434,15 @@ class LLMOutputParser:
         Returns:
             (is_valid, error_message)
         """
-        # 检查是否以 [{ 开头
-        stripped = json_str.strip()
-        if not stripped.startswith('[{'):
+        # 检查是否以 [{ 开头（不复制字符串）
+        if not _ARRAY_PREFIX_RE.match(json_str):
             return False, "JSON 必须是数组格式，以 [{ 开头"
         
-        # 检查范围符号
-        if '~' in json_str:
-            return False, "禁止使用范围符号 ~"
-        
-        # 检查千位分隔符（在数字上下文中）
-        if re.search(r'\d{1,3},\d{3}', json_str):
+        # 范围符号 / 千位分隔符（在数字上下文中）一次扫描；两者都有时优先报告范围符号
+        match = _VALIDATE_BAD_RE.search(json_str)
+        if match:
+            if match.group(0) == '~' or '~' in json_str[match.end():]:
+                return False, "禁止使用范围符号 ~"
             return False, "禁止使用千位分隔符 ,"
         
         return True, ""
-
-
-# 测试代码
-if __name__ == '__main__':
-    parser = LLMOutputParser()
-    
-    # 测试用例 1: 标准格式
-    test1 = """
-    <reasoning>
-    1h 周期分析：上涨趋势
-    15m 周期分析：突破确认
-    决策：开多仓
-    </reasoning>
-    
-    <decision>
-    {
-      "symbol": "BTCUSDT",
-      "action": "open_long",
-      "leverage": 2,
-      "position_size_usd": 200.0,
-      "stop_loss": 84710.0,
-      "take_profit": 88580.0,
-      "confidence": 75,
-      "risk_usd": 30.0
-    }
-    </decision>
-    """
-    
-    result1 = parser.parse(test1)
-    print("测试 1 - 标准格式:")
-    print(f"  推理: {result1['reasoning'][:50]}...")
-    print(f"  决策: {result1['decision']}")
-    print()
-    
-    # 测试用例 2: 全角字符
-    test2 = """
-    <decision>
-    ｛"symbol"："BTCUSDT"，"action"："hold"，"confidence"：50｝
-    </decision>
-    """
-    
-    result2 = parser.parse(test2)
-    print("测试 2 - 全角字符:")
-    print(f"  决策: {result2['decision']}")
-    print()
-    
-    # 测试用例 3: action 变体
-    test3 = """
-    <decision>
-    {"symbol": "BTCUSDT", "action": "long", "confidence": 80}
-    </decision>
-    """
-    
-    result3 = parser.parse(test3)
-    action = result3['decision'].get('action', '')
-    normalized = parser.normalize_action(action)
-    print("测试 3 - action 变体:")
-    print(f"  原始: {action}")
-    print(f"  标准化: {normalized}")
@@ -9,6 +9,7 @@ Canonical actions:
 """
 
 from enum import Enum
+from functools import lru_cache
 from typing import Optional
 
 
@@ -40,35 +41,64 @@ PASSIVE_ACTIONS = frozenset({
 VALID_ACTIONS = OPEN_ACTIONS | CLOSE_ACTIONS | PASSIVE_ACTIONS
 
 
+# Alias -> canonical action (built once at import; normalize_action is on every decision path)
+_ACTION_MAP = {
+    "open_long": Action.OPEN_LONG.value,
+    "long": Action.OPEN_LONG.value,
+    "buy": Action.OPEN_LONG.value,
+    "go_long": Action.OPEN_LONG.value,
+    "open_short": Action.OPEN_SHORT.value,
+    "short": Action.OPEN_SHORT.value,
+    "sell": Action.OPEN_SHORT.value,
+    "go_short": Action.OPEN_SHORT.value,
+    "close_long": Action.CLOSE_LONG.value,
+    "exit_long": Action.CLOSE_LONG.value,
+    "close_short": Action.CLOSE_SHORT.value,
+    "exit_short": Action.CLOSE_SHORT.value,
+    "wait": Action.WAIT.value,
+    "skip": Action.WAIT.value,
+    "hold": Action.HOLD.value,
+}
+_GENERIC_CLOSE = frozenset({"close", "exit", "close_position"})
+_LONG_SIDES = frozenset({"long", "open_long"})
+_SHORT_SIDES = frozenset({"short", "open_short"})
+_CANON = frozenset(a.value for a in Action)
+
+# Raw (stripped, lowercased) aliases per classifier, so is_*_action needs one set lookup.
+# Generic closes count as close actions but, without a side, as neither long nor short.
+_OPEN_RAW = frozenset(k for k, v in _ACTION_MAP.items() if v in OPEN_ACTIONS)
+_CLOSE_RAW = frozenset(k for k, v in _ACTION_MAP.items() if v in CLOSE_ACTIONS) | _GENERIC_CLOSE
+_LONG_RAW = frozenset(k for k, v in _ACTION_MAP.items() if v in (Action.OPEN_LONG.value, Action.CLOSE_LONG.value))
+_SHORT_RAW = frozenset(k for k, v in _ACTION_MAP.items() if v in (Action.OPEN_SHORT.value, Action.CLOSE_SHORT.value))
+_ACTIVE_RAW = _OPEN_RAW | _CLOSE_RAW
+
+
 def normalize_action(action: Optional[str], position_side: Optional[str] = None) -> str:
     """Normalize aliases to canonical action values."""
-    raw = str(action or "").strip().lower()
-    side = str(position_side or "").strip().lower()
-
-    mapping = {
-        "open_long": Action.OPEN_LONG.value,
-        "long": Action.OPEN_LONG.value,
-        "buy": Action.OPEN_LONG.value,
-        "go_long": Action.OPEN_LONG.value,
-        "open_short": Action.OPEN_SHORT.value,
-        "short": Action.OPEN_SHORT.value,
-        "sell": Action.OPEN_SHORT.value,
-        "go_short": Action.OPEN_SHORT.value,
-        "close_long": Action.CLOSE_LONG.value,
-        "exit_long": Action.CLOSE_LONG.value,
-        "close_short": Action.CLOSE_SHORT.value,
-        "exit_short": Action.CLOSE_SHORT.value,
-        "wait": Action.WAIT.value,
-        "skip": Action.WAIT.value,
-        "hold": Action.HOLD.value,
-    }
-    if raw in mapping:
-        return mapping[raw]
-
-    if raw in {"close", "exit", "close_position"}:
-        if side in {"long", "open_long"}:
+    # Already canonical (the common re-check inside validators): no coercion, no cache lookup.
+    # close_position is excluded because it still depends on position_side.
+    if type(action) is str and action in _CANON:
+        return action
+    return _normalize_action_cached(
+        action if type(action) is str else str(action or ""),
+        position_side if type(position_side) is str else str(position_side or ""),
+    )
+
+
+@lru_cache(maxsize=256)
+def _normalize_action_cached(action: str, position_side: str) -> str:
+    """Pure normalization on str inputs; memoized since the action vocabulary is tiny."""
+    raw = action.strip().lower()
+
+    mapped = _ACTION_MAP.get(raw)
+    if mapped is not None:
+        return mapped
+
+    if raw in _GENERIC_CLOSE:
+        side = position_side.strip().lower()
+        if side in _LONG_SIDES:
             return Action.CLOSE_LONG.value
-        if side in {"short", "open_short"}:
+        if side in _SHORT_SIDES:
             return Action.CLOSE_SHORT.value
         # Side unknown: keep generic close action, caller may resolve later.
         return "close_position"
@@ -76,21 +106,27 @@ def normalize_action(action: Optional[str], position_side: Optional[str] = None)
     return Action.WAIT.value
 
 
+def _raw_action(action: Optional[str]) -> str:
+    """Lowercased, stripped action text used to look up the raw alias sets."""
+    return (action if type(action) is str else str(action or "")).strip().lower()
+
+
 def is_open_action(action: Optional[str]) -> bool:
-    return normalize_action(action) in OPEN_ACTIONS
+    return _raw_action(action) in _OPEN_RAW
 
 
 def is_close_action(action: Optional[str]) -> bool:
-    return normalize_action(action) in CLOSE_ACTIONS
+    return _raw_action(action) in _CLOSE_RAW
 
 
 def is_long_action(action: Optional[str]) -> bool:
-    return normalize_action(action) in {Action.OPEN_LONG.value, Action.CLOSE_LONG.value}
+    return _raw_action(action) in _LONG_RAW
 
 
 def is_short_action(action: Optional[str]) -> bool:
-    return normalize_action(action) in {Action.OPEN_SHORT.value, Action.CLOSE_SHORT.value}
+    return _raw_action(action) in _SHORT_RAW
 
 
 def is_passive_action(action: Optional[str]) -> bool:
-    return normalize_action(action) in PASSIVE_ACTIONS
+    # Anything that is not an open/close alias normalizes to wait/hold
+    return _raw_action(action) not in _ACTIVE_RAW
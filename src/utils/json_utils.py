@@ -2,10 +2,17 @@
 JSON序列化辅助工具 - 处理datetime, numpy等非标准类型
 """
 import json
+import re
 import numpy as np
 import pandas as pd
 from datetime import datetime
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 
 class CustomJSONEncoder(json.JSONEncoder):
     """Custom JSON Encoder to handle datetime and numpy types"""
@@ -37,3 +44,49 @@ def safe_json_dumps(data, **kwargs):
     """Wrapper for json.dumps that uses CustomJSONEncoder by default"""
     kwargs.setdefault('cls', CustomJSONEncoder)
     return json.dumps(data, **kwargs)
+
+
+def fast_json_dumps(data) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, using orjson when available"""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # e.g. non-str keys: fall back to the stdlib encoder
+    return json.dumps(data, cls=CustomJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Tokens valid for json.loads but rejected by orjson: NaN/Infinity literals,
+# lone surrogate escapes and float literals that overflow a double (e.g. 1e400)
+_STDLIB_ONLY_RE = re.compile(r'NaN|Infinity|\\u[dD][89a-fA-F]|[eE][+]?\d{3}')
+
+# Integer literals that may not fit in 64 bits: orjson accepts them but
+# silently returns a float, json.loads keeps the exact int
+_WIDE_INT_RE = re.compile(r'\d{19,}')
+_WIDE_INT_BYTES_RE = re.compile(rb'\d{19,}')
+
+
+def fast_json_loads(text):
+    """
+    Parse JSON with orjson when available.
+
+    Input orjson rejects is re-parsed with json.loads only when it contains a
+    token the stdlib accepts and orjson does not; plain malformed JSON raises
+    straight away instead of being parsed twice. Input with 19+ digit runs
+    goes to json.loads directly so wide integers are not rounded to floats.
+    """
+    is_bytes = isinstance(text, (bytes, bytearray, memoryview))
+    if HAS_ORJSON:
+        wide_int_re = _WIDE_INT_BYTES_RE if is_bytes else _WIDE_INT_RE
+        if not wide_int_re.search(text):
+            try:
+                return orjson.loads(text)
+            except orjson.JSONDecodeError:
+                if is_bytes:
+                    text = bytes(text).decode('utf-8')
+                if not _STDLIB_ONLY_RE.search(text):
+                    raise
+                return json.loads(text)
+    if is_bytes:
+        text = bytes(text).decode('utf-8')
+    return json.loads(text)
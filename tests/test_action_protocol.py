@@ -11,6 +11,8 @@ from src.utils.action_protocol import (
     is_open_action,
     is_close_action,
     is_passive_action,
+    is_long_action,
+    is_short_action,
 )
 
 
@@ -43,3 +45,14 @@ def test_action_classifiers():
     assert is_close_action("close_position")
     assert is_passive_action("wait")
     assert is_passive_action("hold")
+
+
+def test_directional_classifiers_accept_aliases():
+    assert is_long_action(" Buy ")
+    assert is_long_action("exit_long")
+    assert not is_long_action("close_position")
+    assert is_short_action("SELL")
+    assert is_short_action("close_short")
+    assert is_close_action("exit")
+    assert is_passive_action("add_position")
+    assert not is_passive_action("close")
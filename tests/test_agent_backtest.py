@@ -2,24 +2,26 @@
 import asyncio
 import pandas as pd
 import numpy as np
+import pytest
 from src.backtest.agent_wrapper import BacktestAgentRunner
 from src.agents.data_sync_agent import MarketSnapshot
 
-def create_mock_snapshot():
-    """Create a mock market snapshot with trending data"""
+def create_mock_snapshot(seed: int = 0):
+    """Create a mock market snapshot with trending data (deterministic for a given seed)"""
+    rng = np.random.default_rng(seed)
     dates = pd.date_range(start='2024-01-01', periods=100, freq='5min')
     
     # Create an uptrend
     price = np.linspace(50000, 55000, 100)
     # Add some noise
-    price += np.random.normal(0, 100, 100)
+    price += rng.normal(0, 100, 100)
     
     df = pd.DataFrame({
         'open': price,
         'high': price + 50,
         'low': price - 50,
         'close': price,
-        'volume': np.random.uniform(100, 1000, 100)
+        'volume': rng.uniform(100, 1000, 100)
     }, index=dates)
     
     # 1h dataframe (resampled)
@@ -44,7 +46,12 @@ def create_mock_snapshot():
     )
     return snapshot
 
-def test_agent_runner():
+@pytest.fixture(scope="module")
+def mock_snapshot():
+    """Build the mock snapshot (and its 1h resample) once per module"""
+    return create_mock_snapshot()
+
+def test_agent_runner(mock_snapshot):
     print("🧪 Testing BacktestAgentRunner...")
     
     # 1. Initialize
@@ -52,7 +59,7 @@ def test_agent_runner():
     print("✅ Initialized")
     
     # 2. Create Data
-    snapshot = create_mock_snapshot()
+    snapshot = mock_snapshot
     print(f"📊 Created mock snapshot with close price: {snapshot.live_5m['close']:.2f}")
     
     # 3. Run Step
@@ -78,4 +85,4 @@ def test_agent_runner():
     print("\n✅ Test Passed!")
 
 if __name__ == "__main__":
-    test_agent_runner()
+    test_agent_runner(create_mock_snapshot())
@@ -0,0 +1,211 @@
+"""
+测试回测性能指标计算
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.metrics import PerformanceMetrics
+from src.backtest.portfolio import Side, Trade
+
+
+def _curve(values, freq='D'):
+    dates = pd.date_range(start='2024-01-01', periods=len(values), freq=freq)
+    return pd.DataFrame({'total_equity': values}, index=dates)
+
+
+def _max_drawdown(curve):
+    return PerformanceMetrics._calculate_max_drawdown(
+        curve['total_equity'].to_numpy(), curve.index.values
+    )
+
+
+def _trade(pnl, side=Side.LONG, holding_time=None):
+    return Trade(
+        trade_id=0,
+        symbol="BTCUSDT",
+        side=side,
+        action="close",
+        quantity=1.0,
+        price=100.0,
+        timestamp=datetime(2024, 1, 1),
+        pnl=pnl,
+        holding_time=holding_time,
+    )
+
+
+def test_max_drawdown_recovered():
+    """测试回撤恢复后的最大回撤与持续时间"""
+    curve = _curve([100.0, 120.0, 90.0, 110.0, 125.0, 100.0])
+
+    max_dd, max_dd_pct, duration = _max_drawdown(curve)
+
+    assert max_dd == pytest.approx(30.0)
+    assert max_dd_pct == pytest.approx(25.0)
+    # 峰值第1天，第4天恢复
+    assert duration == 3
+
+
+def test_max_drawdown_not_recovered():
+    """测试尚未恢复的回撤持续到最后一天"""
+    curve = _curve([100.0, 120.0, 90.0, 95.0])
+
+    max_dd, _, duration = _max_drawdown(curve)
+
+    assert max_dd == pytest.approx(30.0)
+    assert duration == 2
+
+
+def test_max_drawdown_monotonic_curve():
+    """测试单调上涨净值无回撤"""
+    curve = _curve([100.0, 101.0, 102.0])
+
+    assert _max_drawdown(curve) == (0.0, 0.0, 0)
+
+
+def test_max_drawdown_matches_expanding_max():
+    """测试长净值曲线的最大回撤与 pandas expanding().max() 参考实现一致"""
+    rng = np.random.default_rng(7)
+    curve = _curve(10000 * np.cumprod(1 + rng.normal(0, 0.01, 100_000)), freq='min')
+    equity = curve['total_equity']
+    running_max = equity.expanding().max()
+    drawdown = running_max - equity
+
+    max_dd, max_dd_pct, _ = _max_drawdown(curve)
+
+    assert max_dd == pytest.approx(drawdown.max())
+    assert max_dd_pct == pytest.approx((drawdown / running_max).max() * 100)
+
+
+def test_trade_stats():
+    """测试交易统计"""
+    pnls = np.array([100.0, -50.0, 0.0])
+    holding_times = np.array([2.0, 4.0, np.nan])
+
+    stats = PerformanceMetrics._calculate_trade_stats(pnls, holding_times)
+
+    assert stats['total'] == 3
+    assert stats['winning'] == 1
+    assert stats['losing'] == 1
+    assert stats['profit_factor'] == pytest.approx(2.0)
+    assert stats['avg_pnl'] == pytest.approx(50.0 / 3)
+    assert stats['largest_win'] == pytest.approx(100.0)
+    assert stats['largest_loss'] == pytest.approx(-50.0)
+    assert stats['avg_holding_time'] == pytest.approx(3.0)
+
+
+def test_trade_stats_without_losses():
+    """测试无亏损交易时盈亏比为无穷大"""
+    stats = PerformanceMetrics._calculate_trade_stats(np.array([10.0]), np.array([np.nan]))
+
+    assert stats['profit_factor'] == float('inf')
+    assert stats['avg_loss'] == 0
+
+
+def test_side_stats():
+    """测试多空分类统计"""
+    pnls = np.array([100.0, -20.0, -30.0])
+    sides = np.array([0, 0, 1], dtype=np.int8)
+
+    long_stats, short_stats = PerformanceMetrics._calculate_side_stats(pnls, sides)
+
+    assert long_stats['count'] == 2
+    assert long_stats['win_rate'] == pytest.approx(50.0)
+    assert long_stats['total_pnl'] == pytest.approx(80.0)
+    assert short_stats['count'] == 1
+    assert short_stats['win_rate'] == pytest.approx(0.0)
+    assert short_stats['total_pnl'] == pytest.approx(-30.0)
+
+
+def test_calculate_uses_closed_trades_only():
+    """测试汇总指标只统计平仓交易"""
+    curve = _curve([100.0, 110.0, 105.0])
+    opening = _trade(0.0)
+    opening.action = "open"
+    trades = [
+        opening,
+        _trade(10.0, Side.LONG, holding_time=1.0),
+        _trade(-5.0, Side.SHORT, holding_time=3.0),
+    ]
+
+    result = PerformanceMetrics.calculate(curve, trades, 100.0)
+
+    assert result.total_trades == 2
+    assert result.long_trades == 1
+    assert result.short_trades == 1
+    assert result.avg_holding_time == pytest.approx(2.0)
+    assert result.trading_days == 1
+
+
+def test_risk_metrics_match_pandas():
+    """测试风险指标与 pandas 收益率统计一致"""
+    equity = pd.Series([100.0, 103.0, 101.0, 104.0, 99.0, 102.0, 106.0])
+    returns = equity.pct_change().dropna()
+
+    sharpe, sortino, _, volatility = PerformanceMetrics._calculate_risk_metrics(
+        equity.to_numpy(), 6.0, 5.0
+    )
+
+    n = len(returns)
+    excess = 6.0 - PerformanceMetrics.RISK_FREE_RATE * n / PerformanceMetrics.TRADING_DAYS_PER_YEAR * 100
+    downside_std = returns[returns < 0].std() * 100
+    assert volatility == pytest.approx(returns.std() * np.sqrt(365) * 100)
+    assert sharpe == pytest.approx(excess / (returns.std() * 100 * np.sqrt(n)))
+    assert sortino == pytest.approx(excess / (downside_std * np.sqrt(n)))
+
+
+def test_metrics_to_dict_formatting():
+    """测试指标格式化输出"""
+    result = PerformanceMetrics.calculate(_curve([100.0, 110.0, 105.0]), [_trade(10.0)], 100.0)
+
+    data = result.to_dict()
+
+    assert data['total_return'] == "5.00%"
+    assert data['profit_amount'] == "+5.00"
+    assert data['max_drawdown'] == "$5.00"
+    assert data['max_drawdown_duration'] == "1 days"
+    assert data['total_trades'] == 1
+    assert data['period'] == "2024-01-01 to 2024-01-03"
+    assert 'annualized_return' not in data
+
+
+def test_monthly_returns_pivot():
+    """测试月度收益透视表按实际月份落位"""
+    curve = _curve([100.0, 110.0, 121.0, 99.0], freq='MS')
+    curve.index = pd.DatetimeIndex(['2023-11-15', '2023-12-31', '2024-01-31', '2024-02-10'])
+
+    pivot = PerformanceMetrics.generate_monthly_returns(curve)
+
+    assert list(pivot.index) == [2023, 2024]
+    assert list(pivot.columns) == PerformanceMetrics._MONTH_NAMES
+    assert pivot.loc[2023, 'Dec'] == pytest.approx(10.0)
+    assert pivot.loc[2024, 'Jan'] == pytest.approx(10.0)
+    assert pivot.loc[2024, 'Feb'] == pytest.approx(-100 * 22 / 121)
+    assert np.isnan(pivot.loc[2023, 'Nov'])
+
+
+def test_calculate_empty_backtest():
+    """测试空回测直接返回零值结果"""
+    empty = pd.DataFrame({'total_equity': []}, index=pd.DatetimeIndex([]))
+
+    result = PerformanceMetrics.calculate(empty, [], 1000.0)
+
+    assert result.final_equity == 1000.0
+    assert result.total_trades == 0
+    assert result.to_dict()['period'] == "N/A to N/A"
+
+
+def test_calculate_closed_trades_without_equity_curve():
+    """测试有平仓交易但净值曲线为空 (无列) 时不报错"""
+    trades = [_trade(10.0, holding_time=1.0), _trade(-4.0, Side.SHORT)]
+
+    result = PerformanceMetrics.calculate(pd.DataFrame(), trades, 1000.0)
+
+    assert result.total_trades == 2
+    assert result.final_equity == 1000.0
+    assert result.total_return == 0.0
+    assert result.max_drawdown == 0.0
+    assert result.sharpe_ratio == 0.0
+    assert result.to_dict()['period'] == "N/A to N/A"
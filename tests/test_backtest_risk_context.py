@@ -19,16 +19,17 @@ from src.backtest.engine import BacktestConfig, BacktestEngine
 from src.backtest.portfolio import Side, Trade
 
 
-def _build_snapshot(periods: int = 1600) -> MarketSnapshot:
+def _build_snapshot(periods: int = 1600, seed: int = 0) -> MarketSnapshot:
+    rng = np.random.default_rng(seed)
     idx = pd.date_range("2026-01-01", periods=periods, freq="5min")
-    price = np.linspace(1.0, 1.2, periods) + np.random.normal(0, 0.003, periods)
+    price = np.linspace(1.0, 1.2, periods) + rng.normal(0, 0.003, periods)
     df_5m = pd.DataFrame(
         {
             "open": price,
             "high": price + 0.01,
             "low": price - 0.01,
             "close": price,
-            "volume": np.random.uniform(100, 500, periods),
+            "volume": rng.uniform(100, 500, periods),
         },
         index=idx,
     )
@@ -46,3 +46,16 @@ def test_decision_core_statistics_normalize_legacy_alias():
     stats = agent.get_statistics()
     assert stats["action_distribution"]["open_long"] == 1
     assert stats["action_distribution"]["open_short"] == 1
+
+
+def test_make_decision_sync_matches_async():
+    import asyncio
+
+    quant_analysis = {
+        "trend": {"trend_5m_score": 60, "trend_15m_score": 60, "trend_1h_score": 80},
+        "oscillator": {"osc_5m_score": 0, "osc_15m_score": 0, "osc_1h_score": 0},
+        "sentiment": {"total_sentiment_score": 0},
+    }
+    sync_result = DecisionCoreAgent().make_decision_sync(quant_analysis)
+    async_result = asyncio.run(DecisionCoreAgent().make_decision(quant_analysis))
+    assert sync_result == async_result
@@ -51,3 +51,47 @@ def test_validator_downgrades_unsupported_action_to_wait():
     is_valid, errors = validator.validate(decision)
     assert is_valid, errors
     assert decision["action"] == "wait"
+
+
+def test_validator_rejects_range_and_thousands_separator_strings():
+    validator = DecisionValidator()
+    errors = validator._validate_format({
+        "entry": "86,000.5",
+        "target": "1,2345",
+        "stop": "84000~84500",
+        "reasoning": "Support at 84,000 holds, targets later.",
+    })
+    assert len(errors) == 2
+    assert "entry" in errors[0] and "','" in errors[0]
+    assert "stop" in errors[1] and "'~'" in errors[1]
+
+
+def test_risk_reward_ratio_uses_trade_direction():
+    validator = DecisionValidator()
+    base = {"symbol": "BTCUSDT", "entry_price": 100.0}
+
+    assert validator.calculate_risk_reward_ratio(
+        {**base, "action": "open_long", "stop_loss": 98.0, "take_profit": 104.0}) == 2.0
+    assert validator.calculate_risk_reward_ratio(
+        {**base, "action": "open_short", "stop_loss": 101.0, "take_profit": 97.0}) == 3.0
+    # Take-profit on the wrong side yields a negative ratio instead of passing
+    assert validator.calculate_risk_reward_ratio(
+        {**base, "action": "open_long", "stop_loss": 98.0, "take_profit": 96.0}) == -2.0
+    # Inverted stop cannot be scored
+    assert validator.calculate_risk_reward_ratio(
+        {**base, "action": "open_long", "stop_loss": 101.0, "take_profit": 104.0}) is None
+
+
+def test_validate_many_matches_single_validation():
+    validator = DecisionValidator()
+    decisions = [
+        {"symbol": "BTCUSDT", "action": "hold", "reasoning": "No edge."},
+        {"symbol": "ETHUSDT", "action": "buy", "reasoning": "Breakout.", "leverage": 2,
+         "position_size_usd": 100.0, "current_price": 100.0, "stop_loss": 98.0, "take_profit": 104.0},
+        {"symbol": "SOLUSDT", "action": "wait"},
+    ]
+
+    results = validator.validate_many([dict(d) for d in decisions])
+
+    assert results == [validator.validate(dict(d)) for d in decisions]
+    assert [ok for ok, _ in results] == [True, True, False]
@@ -0,0 +1,35 @@
+"""
+Tests for the orjson-backed fast_json_loads fallbacks.
+"""
+import json
+import math
+
+import pytest
+
+from src.utils import json_utils
+from src.utils.json_utils import fast_json_loads
+
+
+@pytest.mark.parametrize('text', [
+    '{"id": 12345678901234567890123}',
+    '{"id": -9223372036854775809}',
+    '[18446744073709551616]',
+])
+def test_wide_integers_stay_exact(text):
+    assert fast_json_loads(text) == json.loads(text)
+    assert fast_json_loads(text.encode('utf-8')) == json.loads(text)
+
+
+def test_stdlib_only_tokens_fall_back():
+    result = fast_json_loads('{"a": NaN, "b": 1e400}')
+
+    assert math.isnan(result['a'])
+    assert result['b'] == math.inf
+
+
+def test_malformed_json_raises_without_orjson(monkeypatch):
+    monkeypatch.setattr(json_utils, 'HAS_ORJSON', False)
+
+    assert fast_json_loads(b'{"id": 12345678901234567890}') == {'id': 12345678901234567890}
+    with pytest.raises(ValueError):
+        fast_json_loads('{"a": 1,}')
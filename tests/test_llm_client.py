@@ -0,0 +1,143 @@
+"""
+测试 LLM 客户端请求与重试逻辑
+"""
+import asyncio
+import json
+
+import httpx
+
+from src.llm import base
+from src.llm.base import ChatMessage, LLMConfig
+from src.llm.openai_client import OpenAIClient
+
+
+def _handler(responses):
+    """按顺序返回预设状态码的响应"""
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        status = responses[min(len(calls), len(responses)) - 1]
+        if status != 200:
+            return httpx.Response(status, json={"error": "fail"})
+        return httpx.Response(200, json={
+            "model": "gpt-test",
+            "choices": [{"message": {"content": "hello"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        })
+
+    return handle, calls
+
+
+def test_chat_retries_then_succeeds(monkeypatch):
+    """测试可重试错误后成功"""
+    monkeypatch.setattr(base.time, "sleep", lambda _: None)
+    handle, calls = _handler([503, 200])
+    client = OpenAIClient(LLMConfig(api_key="sk-test", model="gpt-test"))
+    client.client = httpx.Client(transport=httpx.MockTransport(handle))
+
+    response = client.chat("system", "user")
+
+    assert response.content == "hello"
+    assert response.usage["total_tokens"] == 5
+    assert len(calls) == 2
+    body = json.loads(calls[0].content)
+    assert body["messages"] == [
+        {"role": "system", "content": "system"},
+        {"role": "user", "content": "user"},
+    ]
+    assert calls[0].headers["Content-Type"] == "application/json"
+    assert response.raw_response is None
+
+
+def test_keep_raw_response():
+    """测试开启 keep_raw_response 时保留原始响应"""
+    handle, _ = _handler([200])
+    client = OpenAIClient(LLMConfig(api_key="sk-test", model="gpt-test", keep_raw_response=True))
+    client.client = httpx.Client(transport=httpx.MockTransport(handle))
+
+    response = client.chat("system", "user")
+
+    assert response.raw_response["choices"][0]["message"]["content"] == "hello"
+
+
+def test_chat_messages_async(monkeypatch):
+    """测试异步调用与重试"""
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(base.asyncio, "sleep", no_sleep)
+
+    async def run():
+        handle, calls = _handler([429, 200])
+        client = OpenAIClient(LLMConfig(api_key="sk-test", model="gpt-test"))
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        async with client:
+            response = await client.chat_messages_async([ChatMessage(role="user", content="hi")])
+        return response, calls
+
+    response, calls = asyncio.run(run())
+
+    assert response.content == "hello"
+    assert len(calls) == 2
+
+
+def test_retry_honors_retry_after(monkeypatch):
+    """测试 429 时遵循 Retry-After 响应头"""
+    waits = []
+    monkeypatch.setattr(base.time, "sleep", waits.append)
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "2"}, json={})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = OpenAIClient(LLMConfig(api_key="sk-test", model="gpt-test"))
+    client.client = httpx.Client(transport=httpx.MockTransport(handle))
+
+    assert client.chat("system", "user").content == "ok"
+    assert waits == [2.0]
+
+
+def test_backoff_after_zero_retry_after(monkeypatch):
+    """测试 Retry-After: 0 之后的连接错误仍按基础延迟退避"""
+    waits = []
+    monkeypatch.setattr(base.time, "sleep", waits.append)
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"}, json={})
+        if len(calls) == 2:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = OpenAIClient(LLMConfig(api_key="sk-test", model="gpt-test", max_retries=3))
+    client.client = httpx.Client(transport=httpx.MockTransport(handle))
+
+    assert client.chat("system", "user").content == "ok"
+    assert waits[0] == 0.0
+    assert client.RETRY_BASE_DELAY <= waits[1] <= client.RETRY_BASE_DELAY * 3
+
+
+def test_backoff_is_jittered_and_capped():
+    """测试退避时间带抖动且不超过上限"""
+    client = OpenAIClient(LLMConfig(api_key="sk-test"))
+
+    wait = client.RETRY_BASE_DELAY
+    for _ in range(50):
+        wait = client._backoff(wait)
+        assert client.RETRY_BASE_DELAY <= wait <= client.RETRY_MAX_DELAY
+
+
+def test_clients_share_connection_pool():
+    """测试多个客户端共享同一连接池，close 不影响其他实例"""
+    first = OpenAIClient(LLMConfig(api_key="sk-test"))
+    second = OpenAIClient(LLMConfig(api_key="sk-test"))
+
+    assert first.client is second.client
+    first.close()
+    assert not second.client.is_closed
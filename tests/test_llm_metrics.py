@@ -0,0 +1,47 @@
+"""
+测试 LLM 调用统计
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from src.llm import metrics
+
+
+def test_concurrent_records_are_counted():
+    """测试并发记录不丢失计数"""
+    provider, model = "test-provider-concurrency", "test-model-concurrency"
+
+    def worker(_):
+        metrics.record_request(provider, model)
+        metrics.record_success(provider, model, 100, {"prompt_tokens": 2, "completion_tokens": 3})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(400)))
+
+    stats = metrics.snapshot()["providers"][provider]
+    assert stats["total_requests"] == 400
+    assert stats["total_success"] == 400
+    assert stats["total_tokens"] == 2000
+    assert stats["avg_latency_ms"] == 100
+
+
+def test_record_error_sets_last_error():
+    """测试错误记录"""
+    provider, model = "test-provider-error", "test-model-error"
+
+    metrics.record_error(provider, model, "HTTP 429")
+
+    stats = metrics.snapshot()["models"][model]
+    assert stats["total_errors"] == 1
+    assert stats["last_error"] == "HTTP 429"
+
+
+def test_stats_to_dict_fields():
+    """测试统计字典包含所有字段与派生指标"""
+    stats = metrics.LLMStats(total_success=2, total_latency_ms=1000, total_tokens=50)
+
+    data = stats.to_dict()
+
+    assert data["avg_latency_ms"] == 500
+    assert data["token_speed_tps"] == 50.0
+    assert "_lock" not in data
+    assert len(data) == 15
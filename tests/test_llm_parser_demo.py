@@ -0,0 +1,57 @@
+"""
+测试 LLM 输出解析器的典型输入（原 llm_parser.py 中的演示用例）
+"""
+from src.strategy.llm_parser import LLMOutputParser
+
+
+def test_parse_standard_format():
+    """测试标准格式：推理标签 + 决策标签"""
+    result = LLMOutputParser().parse("""
+    <reasoning>
+    1h 周期分析：上涨趋势
+    15m 周期分析：突破确认
+    决策：开多仓
+    </reasoning>
+    
+    <decision>
+    {
+      "symbol": "BTCUSDT",
+      "action": "open_long",
+      "leverage": 2,
+      "position_size_usd": 200.0,
+      "stop_loss": 84710.0,
+      "take_profit": 88580.0,
+      "confidence": 75,
+      "risk_usd": 30.0
+    }
+    </decision>
+    """)
+
+    assert result['reasoning'].startswith("1h 周期分析：上涨趋势")
+    assert result['decision']['action'] == 'open_long'
+    assert result['decision']['stop_loss'] == 84710.0
+    assert result['decision']['risk_usd'] == 30.0
+
+
+def test_parse_fullwidth_characters():
+    """测试全角符号修正"""
+    result = LLMOutputParser().parse("""
+    <decision>
+    ｛"symbol"："BTCUSDT"，"action"："hold"，"confidence"：50｝
+    </decision>
+    """)
+
+    assert result['decision'] == {'symbol': 'BTCUSDT', 'action': 'hold', 'confidence': 50}
+
+
+def test_normalize_action_variant():
+    """测试 action 变体标准化"""
+    parser = LLMOutputParser()
+    result = parser.parse("""
+    <decision>
+    {"symbol": "BTCUSDT", "action": "long", "confidence": 80}
+    </decision>
+    """)
+
+    assert result['decision']['action'] == 'long'
+    assert parser.normalize_action(result['decision']['action']) == 'open_long'
@@ -0,0 +1,129 @@
+"""
+测试优化版策略 V2 的指标计算
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies import optimized_v2
+from src.strategies.optimized_v2 import IndicatorState, StrategyConfig, calculate_indicators
+
+
+def _klines(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.cumprod(1 + rng.normal(0, 0.003, n))
+    close[200:240] = close[199]  # 横盘段：布林带宽度为 0
+    return pd.DataFrame({
+        'high': close * (1 + np.abs(rng.normal(0, 0.002, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.002, n))),
+        'close': close,
+        'volume': rng.lognormal(3, 1, n),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='5min'))
+
+
+def _assert_same(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        if isinstance(value, (bool, np.bool_)):
+            assert bool(actual[key]) == bool(value), key
+        elif math.isnan(value):
+            assert math.isnan(actual[key]), key
+        else:
+            # 批量计算只递推尾部窗口的 EMA，MACD 允许 1e-6 的起点误差
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+
+
+@pytest.mark.parametrize("end", [60, 230, 600])
+def test_indicator_state_matches_batch(end):
+    """测试增量状态与批量计算结果一致"""
+    df = _klines().iloc[:end]
+    cfg = StrategyConfig()
+
+    with np.errstate(invalid='ignore'):
+        expected = calculate_indicators(df, cfg)
+
+    _assert_same(expected, IndicatorState.from_frame(df, cfg).indicators())
+
+
+def test_indicator_state_follows_sliding_window(monkeypatch):
+    """测试滑动窗口下增量更新与重新计算一致"""
+    monkeypatch.setattr(optimized_v2, "_STATE_CACHE", OrderedDict())
+    df = _klines()
+    cfg = StrategyConfig()
+
+    # 窗口足够长，EMA 起点差异已衰减到浮点误差以内
+    for end in range(450, 600, 3):
+        window = df.iloc[end - 400:end]
+        state = optimized_v2._indicator_state("BTCUSDT", window, cfg)
+        assert state.last_ts == window.index[-1]
+        with np.errstate(invalid='ignore'):
+            _assert_same(calculate_indicators(window, cfg), state.indicators())
+
+
+def test_indicator_state_rebuilds_on_gap(monkeypatch):
+    """测试窗口无法衔接时重建状态"""
+    monkeypatch.setattr(optimized_v2, "_STATE_CACHE", OrderedDict())
+    df = _klines()
+    cfg = StrategyConfig()
+
+    first = optimized_v2._indicator_state("BTCUSDT", df.iloc[:300], cfg)
+    second = optimized_v2._indicator_state("BTCUSDT", df.iloc[350:500], cfg)
+
+    assert second is not first
+    assert second.last_ts == df.index[499]
+
+
+def test_indicator_state_cache_is_bounded(monkeypatch):
+    """测试状态缓存按 LRU 淘汰最久未使用的币种"""
+    monkeypatch.setattr(optimized_v2, "_STATE_CACHE", OrderedDict())
+    df = _klines(300)
+    cfg = StrategyConfig()
+
+    optimized_v2._indicator_state("SYM0", df, cfg)
+    for i in range(1, optimized_v2._STATE_CACHE_SIZE + 1):
+        optimized_v2._indicator_state("SYM0", df, cfg)  # 命中后移到队尾
+        optimized_v2._indicator_state(f"SYM{i}", df, cfg)
+
+    assert len(optimized_v2._STATE_CACHE) == optimized_v2._STATE_CACHE_SIZE
+    assert ("SYM0", "5m") in optimized_v2._STATE_CACHE
+    assert ("SYM1", "5m") not in optimized_v2._STATE_CACHE
+
+
+def test_rsi_uses_wilder_smoothing():
+    """测试 RSI 为 Wilder 平滑：前 N 个涨跌幅简单均值起步，之后递推"""
+    df = _klines(200, seed=3)
+    period = StrategyConfig().rsi_period
+    delta = np.diff(df['close'].to_numpy())
+    gains = np.clip(delta, 0, None)
+    losses = np.clip(-delta, 0, None)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    expected = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    assert calculate_indicators(df, StrategyConfig())['rsi'] == pytest.approx(expected, rel=1e-9)
+    assert IndicatorState.from_frame(df, StrategyConfig()).indicators()['rsi'] == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("end", [10, 25, 230, 600])
+def test_from_frame_seed_matches_bar_by_bar(end):
+    """测试内核冷启动与逐根递推的状态一致，之后可继续增量更新"""
+    df = _klines().iloc[:end]
+    cfg = StrategyConfig()
+
+    seeded = IndicatorState.from_frame(df, cfg)
+    fed = IndicatorState(cfg)
+    fed._feed(df)
+
+    for name in ('count', 'rsi_count', 'ema_fast', 'ema_slow', 'ema_12', 'ema_26',
+                 'macd_signal', 'avg_gain', 'avg_loss', 'last_close', 'prev_close'):
+        assert getattr(seeded, name) == getattr(fed, name), name
+    _assert_same(fed.indicators(), seeded.indicators())
+
+    for state in (seeded, fed):
+        state.update(30100.0, 29900.0, 30000.0, 25.0)
+    _assert_same(fed.indicators(), seeded.indicators())
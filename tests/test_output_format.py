@@ -86,6 +86,50 @@ def test_parser():
     assert is_valid3 == False, "Range symbol should be invalid"
     print("  ✅ PASSED")
 
+def test_parser_skips_non_json_brackets():
+    parser = LLMOutputParser()
+    
+    # Bracketed prose before the JSON must not hide the real decision
+    result = parser.parse('See [note 1] first, then {"symbol": "ETHUSDT", "action": "hold", "reasoning": "range"}')
+    assert result['decision'].get('action') == 'hold'
+    assert result['decision'].get('symbol') == 'ETHUSDT'
+    
+    # Arrays nested inside the decision object are not decisions themselves
+    for field in ('"levels": [1, 2]', '"tags": ["trend"]'):
+        result = parser.parse('Analysis [see below]. {"symbol": "BTCUSDT", "action": "open_long", "confidence": 80, ' + field + '}')
+        assert result['decision'].get('action') == 'open_long'
+        assert 'parse_error' not in result
+
+def test_parser_keeps_fullwidth_text_in_valid_json():
+    parser = LLMOutputParser()
+    
+    # Valid JSON parses as-is; only malformed JSON gets its full-width punctuation rewritten
+    assert parser._parse_json_with_fallback('{"reasoning": "趋势向上，等待回调"}') == {'reasoning': '趋势向上，等待回调'}
+    assert parser._parse_json_with_fallback('｛"action"： "hold"｝') == {'action': 'hold'}
+
+def test_parser_lenient_branch_uses_pyjson5(monkeypatch):
+    import json
+    import re
+    from types import SimpleNamespace
+    from src.strategy import llm_parser
+    
+    # Stand-in for pyjson5.loads: accepts trailing commas, raises ValueError otherwise
+    calls = []
+    def loads(text):
+        calls.append(text)
+        return json.loads(re.sub(r',\s*([}\]])', r'\1', text))
+    monkeypatch.setattr(llm_parser, 'pyjson5', SimpleNamespace(loads=loads), raising=False)
+    monkeypatch.setattr(llm_parser, 'HAS_PYJSON5', True)
+    parser = LLMOutputParser()
+    
+    # Strict parse fails, the lenient parser handles trailing commas in one pass
+    assert parser._parse_json_with_fallback('[{"action": "hold", "levels": [1, 2,],},]') == {'action': 'hold', 'levels': [1, 2]}
+    assert len(calls) == 1
+    
+    # Invalid body: the lenient parser rejects it and an empty result is returned
+    assert parser._parse_json_with_fallback('{"action": hold}', quiet=True) == {}
+    assert len(calls) == 2
+
 def test_validator():
     print("\n" + "=" * 60)
     print("Testing DecisionValidator")
@@ -0,0 +1,54 @@
+"""
+Tests for the dashboard SharedState history buffers.
+"""
+
+from src.server import state as state_module
+from src.server.state import SharedState
+
+
+def test_decision_history_newest_first_and_bounded():
+    state = SharedState()
+    for i in range(150):
+        state.update_decision({'symbol': 'BTCUSDT', 'cycle': i})
+
+    assert len(state.decision_history) == 100
+    assert state.decision_history[0]['cycle'] == 149
+    assert state.decision_history[-1]['cycle'] == 50
+
+
+def test_recent_logs_bounded():
+    state = SharedState()
+    for i in range(600):
+        state.add_log(f"[x] message {i}")
+
+    assert len(state.recent_logs) == 500
+    assert state.recent_logs[0] == "[x] message 100"
+    assert state.recent_logs[-1] == "[x] message 599"
+
+
+def test_equity_history_bounded():
+    state = SharedState()
+    for i in range(250):
+        state._push_equity(str(i), float(i), i)
+    state.update_account(1000.0, 900.0, 950.0, 50.0)
+
+    history = state.equity_history
+    assert len(history) == 200
+    assert history[0] == {'time': '51', 'value': 51.0, 'cycle': 51}
+    assert history[-1]['value'] == 1000.0
+    assert len(state.equity_times) == len(state.equity_values) == 200
+
+
+def test_update_account_skips_idle_equity_ticks(monkeypatch):
+    state = SharedState()
+    clock = iter(["10:00:00", "10:00:01", "10:00:02", "10:00:02"])
+    monkeypatch.setattr(state_module, "_now_str", lambda: next(clock))
+
+    state.update_account(1000.0, 900.0, 950.0, 0.0)
+    state.update_account(1000.0, 900.0, 950.0, 0.0)  # idle tick: skipped
+    state.update_account(1010.0, 900.0, 950.0, 10.0)
+    state.update_account(1020.0, 900.0, 950.0, 20.0)  # same second: replaces last point
+
+    assert list(state.equity_times) == ["10:00:00", "10:00:02"]
+    assert list(state.equity_values) == [1000.0, 1020.0]
+
@@ -109,5 +109,22 @@ def test_macd_calculation():
     assert not macd_hist.isna().all(), "MACD histogram should not be all NaN"
 
 
+def test_fused_kernel_matches_pandas():
+    """测试融合内核与pandas实现结果一致"""
+    calc = BacktestSignalCalculator()
+    
+    rng = np.random.default_rng(7)
+    for n in (10, 45, 200):
+        close = 100 + np.cumsum(rng.normal(0, 1, n))
+        df = pd.DataFrame({
+            'high': close + np.abs(rng.normal(0, 1, n)),
+            'low': close - np.abs(rng.normal(0, 1, n)),
+            'close': close,
+        })
+        
+        expected = (calc.analyze_trend(df), calc.analyze_oscillator(df))
+        assert calc._compute_tf(df) == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -1,7 +1,11 @@
 
 import sys
 import os
+import re
 import asyncio
+import collections
+import functools
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
@@ -9,48 +13,104 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.backtest.agent_wrapper import BacktestAgentRunner
 from src.agents.data_sync_agent import MarketSnapshot
+from src.utils.jit import njit
 
-def create_mock_df(periods=100, start_price=100.0):
-    """Create a mock DataFrame with enough data for analysis"""
-    data = []
-    price = start_price
-    for i in range(periods):
-        price += (i % 2 - 0.5) * 2 # Random walkish
-        data.append({
-            'timestamp': datetime.now(),
-            'open': price,
-            'high': price + 1,
-            'low': price - 1,
-            'close': price + 0.5,
-            'volume': 1000
-        })
-    df = pd.DataFrame(data)
-    # Add indicators needed by StrategyComposer
-    df['ema_20'] = df['close'].ewm(span=20).mean()
-    df['ema_60'] = df['close'].ewm(span=60).mean()
-    df['bb_upper'] = df['close'] * 1.02
-    df['bb_middle'] = df['close']
-    df['bb_lower'] = df['close'] * 0.98
-    df['kdj_k'] = 50
-    df['kdj_j'] = 50
-    return df
+@njit(cache=True)
+def _ewma(x, span):
+    """Adjusted EWMA, same as pd.Series.ewm(span=span).mean() for NaN-free input"""
+    decay = 1.0 - 2.0 / (span + 1)
+    y = np.empty_like(x)
+    num = 0.0
+    den = 0.0
+    for i in range(x.size):
+        num = x[i] + decay * num
+        den = 1.0 + decay * den
+        y[i] = num / den
+    return y
 
-async def verify_strategy():
-    print("🧪 Verifying Strategy Integration...")
+_OHLCV_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ns]'),
+    ('open', 'f4'),
+    ('high', 'f4'),
+    ('low', 'f4'),
+    ('close', 'f4'),
+    ('volume', 'i8'),
+])
+
+def create_mock_df(periods=100, start_price=100.0, indicators=('ema', 'bb')):
+    """Create a mock DataFrame with enough data for analysis
+
+    ``indicators`` selects the precomputed columns: 'ema', 'bb' and 'kdj'.
+    StrategyComposer already treats a missing kdj_j as 50, the same value as
+    the placeholder, so the KDJ columns are opt-in.
+
+    Frames are cached per argument set (timestamps are fixed at the first
+    build); every call returns its own copy, so callers may mutate it.
+    """
+    return _build_mock_df(periods, start_price, tuple(indicators)).copy()
+
+@functools.lru_cache(maxsize=16)
+def _build_mock_df(periods, start_price, indicators):
+    i = np.arange(periods)
+    price = (start_price + np.cumsum((i % 2 - 0.5) * 2)).astype(np.float32)  # Random walkish
+    close = price + np.float32(0.5)
+    # Indicators needed by StrategyComposer, collected so the frame is built in one go
+    derived = {}
+    if 'ema' in indicators:
+        derived['ema_20'] = _ewma(close, 20)
+        derived['ema_60'] = _ewma(close, 60)
+    if 'bb' in indicators:
+        derived['bb_upper'] = close * 1.02
+        derived['bb_middle'] = close
+        derived['bb_lower'] = close * 0.98
+    if 'kdj' in indicators:
+        derived['kdj_k'] = np.full(periods, 50, dtype=np.int64)
+        derived['kdj_j'] = np.full(periods, 50, dtype=np.int64)
     
-    # 1. Initialize Runner with LLM enabled
+    dtype = np.dtype(_OHLCV_DTYPE.descr + [(name, col.dtype) for name, col in derived.items()])
+    bars = np.empty(periods, dtype=dtype)
+    bars['timestamp'] = pd.date_range(end=pd.Timestamp.now(), periods=periods, freq='1min')
+    bars['open'] = price
+    bars['high'] = price + 1
+    bars['low'] = price - 1
+    bars['close'] = close
+    bars['volume'] = 1000
+    for name, col in derived.items():
+        bars[name] = col
+    return pd.DataFrame.from_records(bars)
+
+# Sections the multi-agent context must contain, matched in a single scan
+CONTEXT_SECTIONS = (
+    "Four-Layer Strategy Status",
+    "Detailed Market Analysis",
+    "Trend & Direction Analysis",
+    "Entry Zone Analysis",
+)
+_CONTEXT_SECTION_RE = re.compile('|'.join(map(re.escape, CONTEXT_SECTIONS)))
+
+def create_runner():
+    """Create the LLM-enabled runner under test; one instance can serve many verification runs"""
     config = {'use_llm': True, 'symbol': 'BTCUSDT'}
-    runner = BacktestAgentRunner(config)
+    return BacktestAgentRunner(config)
+
+async def verify_strategy(runner=None):
+    print("🧪 Verifying Strategy Integration...")
+    
+    # Build the mock frame on a worker thread while the runner initializes
+    mock_df_task = asyncio.get_running_loop().run_in_executor(None, create_mock_df, 100)
+    
+    # 1. Initialize Runner with LLM enabled (reuse the caller's runner if given)
+    if runner is None:
+        runner = create_runner()
     
     # Mock StrategyEngine.make_decision to avoid API cost and verify context
     original_make_decision = runner.llm_engine.make_decision
     
-    captured_context = []
+    # Only the latest context is verified, so keep just that one
+    captured_context = collections.deque(maxlen=1)
     
     def mock_make_decision(market_context_text, market_context_data, reflection=None):
-        print("\n📝 CAPTURED CONTEXT START")
-        print(market_context_text[:500] + "...")
-        print("📝 CAPTURED CONTEXT END\n")
+        # Keep the mock free of I/O; the context preview is printed once below
         captured_context.append(market_context_text)
         return {
             'action': 'hold',
@@ -61,10 +121,10 @@ async def verify_strategy():
         
     runner.llm_engine.make_decision = mock_make_decision
     
-    # 2. Create Mock Snapshot
-    df_1h = create_mock_df(100)
-    df_15m = create_mock_df(100)
-    df_5m = create_mock_df(100)
+    # 2. Create Mock Snapshot (identical frames; the runner only reads them)
+    df_1h = await mock_df_task
+    df_15m = df_1h.copy(deep=False)
+    df_5m = df_1h.copy(deep=False)
     
     snapshot = MarketSnapshot(
         timestamp=datetime.now(),
@@ -87,16 +147,14 @@ async def verify_strategy():
     
     # 4. Verify Context Content
     if captured_context:
-        ctx = captured_context[0]
-        checks = [
-            "Four-Layer Strategy Status",
-            "Detailed Market Analysis",
-            "Trend & Direction Analysis",
-            "Entry Zone Analysis"
-        ]
+        ctx = captured_context[-1]
+        print("\n📝 CAPTURED CONTEXT START")
+        print(ctx[:500] + "...")
+        print("📝 CAPTURED CONTEXT END\n")
+        found = set(_CONTEXT_SECTION_RE.findall(ctx))
         all_passed = True
-        for check in checks:
-            if check in ctx:
+        for check in CONTEXT_SECTIONS:
+            if check in found:
                 print(f"✅ Found '{check}'")
             else:
                 print(f"❌ Missing '{check}'")